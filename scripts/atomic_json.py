@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Atomic JSON writes for the caches shared between scripts.
+
+The file is written to a temp file in the same directory and renamed over
+the target, so a reader running at the same time sees either the old or
+the new contents, never a partial file.
+"""
+
+import json
+import os
+import tempfile
+
+
+def write_json(path, data, **dump_args):
+    """Replace path with data serialized as JSON; errors are left to the caller"""
+    path = os.fspath(path)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, **dump_args)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -1,8 +1,105 @@
 #!/usr/bin/env python3
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, Gdk, Pango
+from gi.repository import Gtk, Gdk, Gio, GLib, Pango
+import collections
 import os
+import re
+import sys
+import time
+
+from hypr_binds import BindsLoader
+
+# Shared so a resident host re-opening the window reuses the token cache
+BINDS_LOADER = BindsLoader()
+
+# Category display order
+CATEGORY_ORDER = [
+    'workspaces',
+    'window management',
+    'apps',
+    'scratchpads',
+    'system',
+    'other'
+]
+
+# Tree store columns
+COL_KEY = 0
+COL_DESC = 1
+COL_COLOR = 2
+COL_SCALE = 3
+COL_VISIBLE = 4
+COL_RANK = 5
+CATEGORY_SCALE = 1.2
+
+RELOAD_DEBOUNCE_MS = 150
+FUZZY_GAP = 3  # max chars skipped between two fuzzy-matched query chars
+# Anything that can change a file's contents; attribute-only changes are ignored
+RELOAD_EVENTS = (
+    Gio.FileMonitorEvent.CHANGED,
+    Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+    Gio.FileMonitorEvent.CREATED,
+    Gio.FileMonitorEvent.DELETED,
+    Gio.FileMonitorEvent.RENAMED,
+    Gio.FileMonitorEvent.MOVED_IN,
+    Gio.FileMonitorEvent.MOVED_OUT
+)
+
+# One searchable bind row; tokens/text are the normalized key combo, command and description
+SearchRow = collections.namedtuple('SearchRow', ['iter', 'tokens', 'text', 'position'])
+
+
+def normalize(text):
+    """Lowercase alphanumeric tokens, so "SUPER SHIFT, Return" -> ["super", "shift", "return"]"""
+    return re.sub(r"[^0-9a-z]+", " ", text.lower()).split()
+
+
+def score_term(term, tokens, text):
+    """Score one query term against a row; 0 means no match
+
+    Whole tokens beat token prefixes, which beat substrings, which beat
+    in-order (fuzzy) matches, which lose a little per skipped char.
+    """
+    best = 0
+    for token in tokens:
+        if token == term:
+            return 40
+        if token.startswith(term):
+            best = 30
+    if best:
+        return best
+    if term in text:
+        return 20
+
+    # Fuzzy: every char in order, at most FUZZY_GAP chars apart. Checking the
+    # gaps (not the total span) keeps a longer query's matches a subset of a
+    # shorter one's, which the incremental search relies on.
+    best = 0
+    start = text.find(term[0])
+    while start >= 0:
+        pos = start
+        for char in term[1:]:
+            found = text.find(char, pos + 1)
+            if found < 0:
+                return best  # later starts can't do better
+            if found - pos - 1 > FUZZY_GAP:
+                break
+            pos = found
+        else:
+            best = max(best, 10 - min(9, pos - start + 1 - len(term)))
+        start = text.find(term[0], start + 1)
+    return best
+
+
+def score_row(terms, row):
+    score = 0
+    for term in terms:
+        term_score = score_term(term, row.tokens, row.text)
+        if not term_score:
+            return 0
+        score += term_score
+    return score
+
 
 def get_pywal_colors():
     """Load Pywal color scheme"""
@@ -15,6 +112,8 @@ def get_pywal_colors():
 class PixelPerfectShortcuts(Gtk.Window):
     def __init__(self):
         super().__init__(title="HyprBinds")
+        # CSS is scoped to this name; scratchpads.py hosts other windows in the same process
+        self.set_name("hyprbinds")
         colors = get_pywal_colors()
         
         # Window configuration
@@ -32,33 +131,24 @@ class PixelPerfectShortcuts(Gtk.Window):
         """Apply CSS styling from Pywal colors"""
         css_provider = Gtk.CssProvider()
         css = f"""
-        * {{
-            font-family: 'Fira Code', monospace;
+        #hyprbinds, #hyprbinds * {{
+            font-family: 'MesloLGL Nerd Font', 'Fira Code', monospace;
+            font-weight: bold;
+            font-size: 12pt;
         }}
-        window {{
+        #hyprbinds, #hyprbinds treeview {{
             background-color: {colors['color0']};
+            color: {colors['color7']};
         }}
-        .category {{
-            color: {colors['color2']};
-            font-weight: bold;
-            font-size: 1.2em;
-            margin-top: 15px;
-            margin-bottom: 5px;
-            margin-left: 20px;
-        }}
-        .header {{
+        #hyprbinds treeview header button {{
+            background: {colors['color0']};
             color: {colors['color3']};
-            font-weight: bold;
-            margin-bottom: 5px;
-        }}
-        .keybind {{
-            color: {colors['color4']};
-            font-weight: bold;
-            min-width: 250px;  /* Fixed width for keybinds */
+            border: none;
+            box-shadow: none;
+            padding: 5px 10px;
         }}
-        .description {{
-            color: {colors['color7']};
-            min-width: 400px;  /* Fixed width for descriptions */
+        #hyprbinds treeview.view {{
+            padding: 3px 10px;
         }}
         """
         css_provider.load_from_data(css.encode())
@@ -69,139 +159,255 @@ class PixelPerfectShortcuts(Gtk.Window):
         )
 
     def create_layout(self, colors):
-        """Create perfectly aligned layout"""
+        """Create the search entry and the keybind tree"""
+        outer_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        self.add(outer_box)
+
+        # "changed" rather than "search-changed": filtering is cheap enough to skip its delay
+        self.search = Gtk.SearchEntry()
+        self.search.set_placeholder_text("Search keybinds")
+        self.search.connect("changed", self.on_search_changed)
+        self.search.connect("stop-search", lambda entry: entry.set_text(""))
+        outer_box.pack_start(self.search, False, False, 0)
+        self.connect("key-press-event", self.on_key_press)
+
         scrolled = Gtk.ScrolledWindow()
         scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-        self.add(scrolled)
+        outer_box.pack_start(scrolled, True, True, 0)
 
-        main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
-        scrolled.add(main_box)
+        # Categories are parent rows; search hides rows through the filter
+        # and ranks them through the sort, so the store itself only changes
+        # when the config does
+        self.store = Gtk.TreeStore(str, str, str, float, bool, int)
+        self.filter = self.store.filter_new()
+        self.filter.set_visible_column(COL_VISIBLE)
+        self.sorted = Gtk.TreeModelSort(model=self.filter)
+        self.sorted.set_sort_column_id(COL_RANK, Gtk.SortType.ASCENDING)
 
-        # Get categorized binds
-        categorized_binds = self.get_categorized_binds()
+        self.view = Gtk.TreeView(model=self.sorted)
+        self.view.set_enable_search(False)
+        self.view.set_show_expanders(False)
+        self.view.set_level_indentation(0)
+        self.view.get_selection().set_mode(Gtk.SelectionMode.NONE)
+        scrolled.add(self.view)
+
+        # Category titles and keybinds share the first column and differ only in
+        # color and size, which CSS can't select per row; everything else is CSS
+        key_column = Gtk.TreeViewColumn(
+            "KEYBIND", Gtk.CellRendererText(ellipsize=Pango.EllipsizeMode.END),
+            text=COL_KEY, foreground=COL_COLOR, scale=COL_SCALE
+        )
+        key_column.set_min_width(250)
+        self.view.append_column(key_column)
+
+        desc_column = Gtk.TreeViewColumn(
+            "DESCRIPTION", Gtk.CellRendererText(ellipsize=Pango.EllipsizeMode.END), text=COL_DESC
+        )
+        desc_column.set_min_width(400)
+        desc_column.set_expand(True)
+        self.view.append_column(desc_column)
 
-        # Category display order
-        category_order = [
-            'workspaces',
-            'window management',
-            'apps',
-            'scratchpads',
-            'system',
-            'other'
-        ]
-
-        for category in category_order:
-            if category in categorized_binds and categorized_binds[category]:
-                # Category header
-                lbl_category = Gtk.Label(label=category.upper())
-                lbl_category.set_xalign(0)
-                lbl_category.get_style_context().add_class("category")
-                main_box.pack_start(lbl_category, False, False, 0)
-
-                # Create a grid for perfect alignment
-                grid = Gtk.Grid()
-                grid.set_column_spacing(30)
-                grid.set_row_spacing(3)  # Tighter row spacing
-                grid.set_margin_start(20)
-                grid.set_margin_end(20)
-                grid.set_margin_bottom(10)
-                main_box.pack_start(grid, False, False, 0)
-
-                # Column headers
-                key_header = Gtk.Label(label="KEYBIND")
-                key_header.set_xalign(0)
-                key_header.get_style_context().add_class("header")
-                
-                desc_header = Gtk.Label(label="DESCRIPTION")
-                desc_header.set_xalign(0)
-                desc_header.get_style_context().add_class("header")
-                
-                grid.attach(key_header, 0, 0, 1, 1)
-                grid.attach(desc_header, 1, 0, 1, 1)
-
-                # Add all binds for this category
-                for i, (keybind, description) in enumerate(categorized_binds[category], start=1):
-                    # Keybind label with fixed width
-                    lbl_key = Gtk.Label(label=keybind)
-                    lbl_key.set_xalign(0)
-                    lbl_key.get_style_context().add_class("keybind")
-                    lbl_key.set_halign(Gtk.Align.START)
-                    
-                    # Description label with fixed width
-                    lbl_desc = Gtk.Label(label=description)
-                    lbl_desc.set_xalign(0)
-                    lbl_desc.get_style_context().add_class("description")
-                    lbl_desc.set_halign(Gtk.Align.START)
-                    lbl_desc.set_line_wrap(True)
-                    
-                    grid.attach(lbl_key, 0, i, 1, 1)
-                    grid.attach(lbl_desc, 1, i, 1, 1)
-
-        # Apply monospace font to everything
-        font_desc = Pango.FontDescription("MesloLGL Nerd Font Bold 12")
-        def apply_font(widget):
-            if isinstance(widget, Gtk.Label):
-                widget.override_font(font_desc)
-                widget.set_ellipsize(Pango.EllipsizeMode.END)
-            elif hasattr(widget, 'get_children'):
-                for child in widget.get_children():
-                    apply_font(child)
-        apply_font(main_box)
+        self.colors = colors
+        self.sections = {}  # category -> parent row iter in self.store
+        self.shown = {}     # category -> binds currently under its parent row
+        self.rows = {}      # category -> SearchRow list in config order
+        self.query = ""
+        self.matches = None  # SearchRow -> score for self.query, None when not searching
+
+        for category, binds in self.get_categorized_binds().items():
+            self.patch_category(category, binds)
+        self.view.expand_all()
+
+        # Live reload: watch every config file the binds came from
+        self.monitors = {}  # path -> Gio.FileMonitor
+        self.reload_source = None
+        self.stale = False
+        self.watch_files(BINDS_LOADER.files)
+        self.connect("map", self.on_map)
+
+    def build_section(self, category):
+        """Add the parent row for one category, in display order"""
+        # Sections before this one in CATEGORY_ORDER decide its position
+        order = CATEGORY_ORDER.index(category)
+        position = sum(1 for c in CATEGORY_ORDER[:order] if c in self.sections)
+        parent = self.store.insert(None, position, [
+            category.upper(), "", self.colors['color2'], CATEGORY_SCALE, True, order
+        ])
+        self.sections[category] = parent
+        return parent
+
+    def patch_category(self, category, binds):
+        """Bring one category's rows in line with binds, leaving the others alone"""
+        if self.shown.get(category, []) == binds:
+            return
+
+        # Rows are being replaced, so the incremental search must start over
+        self.matches = None
+        if not binds:
+            self.store.remove(self.sections.pop(category))
+            del self.shown[category]
+            del self.rows[category]
+            return
+
+        if category in self.sections:
+            parent = self.sections[category]
+            child = self.store.iter_children(parent)
+            while child is not None and self.store.remove(child):
+                pass
+        else:
+            parent = self.build_section(category)
+
+        # Add all binds for this category
+        rows = []
+        for i, (keybind, description, command) in enumerate(binds, start=1):
+            row_iter = self.store.append(parent, [keybind, description, self.colors['color4'], 1.0, True, i])
+            tokens = tuple(normalize(f"{keybind} {command} {description}"))
+            rows.append(SearchRow(row_iter, tokens, " ".join(tokens), i))
+        self.shown[category] = binds
+        self.rows[category] = rows
+        if self.query:
+            self.filter_rows(self.query)
+
+    def on_key_press(self, widget, event):
+        # Typing anywhere in the window goes to the search entry
+        return self.search.handle_event(event)
+
+    def on_search_changed(self, entry):
+        self.filter_rows(entry.get_text())
+
+    def filter_rows(self, query):
+        """Hide non-matching rows and order the rest by score, in place in the store"""
+        terms = normalize(query)
+        if not terms:
+            self.matches = None
+            candidates = None
+        elif self.matches is not None and query.startswith(self.query):
+            # A longer query can only match a subset of what the shorter one did
+            candidates = self.matches
+        else:
+            candidates = [row for rows in self.rows.values() for row in rows]
+        self.query = query
+
+        if candidates is not None:
+            self.matches = {}
+            for row in candidates:
+                score = score_row(terms, row)
+                if score:
+                    self.matches[row] = score
+
+        for category, rows in self.rows.items():
+            if self.matches is None:
+                ranked, hidden = rows, []
+            else:
+                ranked = sorted((row for row in rows if row in self.matches),
+                                key=lambda row: (-self.matches[row], row.position))
+                hidden = [row for row in rows if row not in self.matches]
+
+            for rank, row in enumerate(ranked + hidden, start=1):
+                visible = rank <= len(ranked)
+                if (self.store[row.iter][COL_VISIBLE], self.store[row.iter][COL_RANK]) != (visible, rank):
+                    self.store.set(row.iter, COL_VISIBLE, visible, COL_RANK, rank)
+            self.store.set_value(self.sections[category], COL_VISIBLE, bool(ranked))
+        # Rows the filter brings back come in collapsed
+        self.view.expand_all()
+
+    def watch_files(self, paths):
+        """Monitor exactly the given files, dropping ones no longer sourced"""
+        for path in set(self.monitors) - set(paths):
+            self.monitors.pop(path).cancel()
+        for path in paths:
+            if path in self.monitors:
+                continue
+            try:
+                monitor = Gio.File.new_for_path(path).monitor_file(Gio.FileMonitorFlags.WATCH_MOVES, None)
+            except GLib.Error as e:
+                print(f"Cannot watch {path}: {e.message}")
+                continue
+            monitor.connect("changed", self.on_file_changed)
+            self.monitors[path] = monitor
+
+    def on_file_changed(self, monitor, file, other_file, event_type):
+        if event_type not in RELOAD_EVENTS:
+            return
+        if not self.get_mapped():
+            # Hidden in the scratchpad host; catch up when shown again
+            self.stale = True
+            return
+        # Editors write in several steps, so wait for them to settle
+        if self.reload_source is not None:
+            GLib.source_remove(self.reload_source)
+        self.reload_source = GLib.timeout_add(RELOAD_DEBOUNCE_MS, self.reload)
+
+    def on_map(self, widget):
+        if self.stale:
+            self.reload()
+
+    def reload(self):
+        self.reload_source = None
+        self.stale = False
+        categorized_binds = self.get_categorized_binds()
+        for category in CATEGORY_ORDER:
+            self.patch_category(category, categorized_binds[category])
+        self.view.expand_all()
+        # Includes may have been added or removed
+        self.watch_files(BINDS_LOADER.files)
+        return False
 
     def get_categorized_binds(self):
-        """Parse and categorize binds.conf with perfect alignment in mind"""
-        categories = {
-            'workspaces': [],
-            'window management': [],
-            'apps': [],
-            'scratchpads': [],
-            'system': [],
-            'other': []
-        }
+        """Categorize the binds from hyprland.conf and everything it sources"""
+        categories = {category: [] for category in CATEGORY_ORDER}
 
         try:
-            with open(f"{os.environ['HOME']}/.config/hypr/binds.conf") as f:
-                for line in f:
-                    if line.startswith(('bind', 'binde', 'bindm')):
-                        # Skip empty/commented binds
-                        if not line.strip() or line.strip().startswith('#'):
-                            continue
-                            
-                        parts = line.split('#', 1)
-                        if len(parts) < 2:
-                            continue
-                            
-                        cmd_part = parts[0].split('=', 1)[1].strip()
-                        description = parts[1].strip()
-                        
-                        # Extract key combination (first 2 parts)
-                        key_parts = [x.strip() for x in cmd_part.split(',')[:2]]
-                        keybind = ', '.join(key_parts)
-                        
-                        # Standardize description capitalization
-                        description = description[0].upper() + description[1:]
-                        
-                        # Categorize based on description
-                        desc_lower = description.lower()
-                        if 'window' in desc_lower:
-                            categories['window management'].append((keybind, description))
-                        elif 'launch' in desc_lower:
-                            categories['apps'].append((keybind, description))
-                        elif 'workspace' in desc_lower:
-                            categories['workspaces'].append((keybind, description))
-                        elif 'scratchpad' in desc_lower:
-                            categories['scratchpads'].append((keybind, description))
-                        elif 'hyprland' in desc_lower:
-                            categories['system'].append((keybind, description))
-                        else:
-                            categories['other'].append((keybind, description))
-                            
+            config = BINDS_LOADER.load()
         except Exception as e:
             print(f"Error loading binds: {e}")
-        
+            return categories
+
+        for bind in config.binds:
+            # Only documented binds are shown
+            if not bind.description:
+                continue
+            keybind = f"{bind.mods}, {bind.key}" if bind.mods else bind.key
+            command = f"{bind.dispatcher} {bind.params}".strip()
+
+            # Standardize description capitalization
+            description = bind.description[0].upper() + bind.description[1:]
+
+            # Categorize based on description
+            desc_lower = description.lower()
+            if 'window' in desc_lower:
+                categories['window management'].append((keybind, description, command))
+            elif 'launch' in desc_lower:
+                categories['apps'].append((keybind, description, command))
+            elif 'workspace' in desc_lower:
+                categories['workspaces'].append((keybind, description, command))
+            elif 'scratchpad' in desc_lower:
+                categories['scratchpads'].append((keybind, description, command))
+            elif 'hyprland' in desc_lower:
+                categories['system'].append((keybind, description, command))
+            else:
+                categories['other'].append((keybind, description, command))
+
         return categories
 
+def time_startup():
+    """Print the time from construction to the window's first map, then quit"""
+    start = time.perf_counter()
+    win = PixelPerfectShortcuts()
+
+    def on_mapped(widget, event):
+        print(f"Startup: {(time.perf_counter() - start) * 1000:.1f} ms (construction to first map)")
+        Gtk.main_quit()
+        return False
+
+    win.connect("map-event", on_mapped)
+    win.show_all()
+    Gtk.main()
+
 if __name__ == "__main__":
+    if "--time-startup" in sys.argv:
+        time_startup()
+        sys.exit(0)
     win = PixelPerfectShortcuts()
     win.connect("destroy", Gtk.main_quit)
     win.show_all()
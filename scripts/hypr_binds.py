@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Hyprland config tokenizer for the keybind viewer.
+
+Starting from hyprland.conf, every `source =` include is followed (with ~,
+globs, environment and $variables expanded, relative to the including file)
+and every bind* keyword is read, including its flag letters: binde, bindm,
+bindl, bindr, bindd (which carries its own description) and combinations.
+Comments follow Hyprland's rules, so `##` is a literal `#` and only the
+first real `#` starts the trailing description.
+
+Each file's tokens are cached in ~/.cache/hyprbinds/tokens.json keyed by
+path, mtime and size, so loading unchanged configs only costs a stat() per
+file. Variables and includes are resolved after the cache, since a file's
+meaning depends on what was defined before it.
+"""
+
+import collections
+import glob
+import json
+import os
+import re
+import sys
+
+from atomic_json import write_json
+
+HYPR_DIR = os.path.expanduser("~/.config/hypr")
+ROOT_CONFIG = os.path.join(HYPR_DIR, "hyprland.conf")
+BINDS_CONFIG = os.path.join(HYPR_DIR, "binds.conf")
+CACHE_FILE = os.path.expanduser("~/.cache/hyprbinds/tokens.json")
+CACHE_VERSION = 1
+
+BIND_RE = re.compile(r"^bind([a-z]*)$")
+
+Bind = collections.namedtuple('Bind', [
+    'flags', 'mods', 'key', 'dispatcher', 'params', 'description', 'submap', 'path', 'line'
+])
+# binds in include order, and every config file that was read (for watching)
+Config = collections.namedtuple('Config', ['binds', 'files'])
+
+
+def split_comment(line):
+    """Return (content, comment) with ## unescaped to #; comment is None if absent"""
+    if '#' not in line:
+        return line, None
+    content = []
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if char == '#':
+            if line[i + 1:i + 2] == '#':
+                content.append('#')
+                i += 2
+                continue
+            return ''.join(content), line[i + 1:]
+        content.append(char)
+        i += 1
+    return ''.join(content), None
+
+
+def tokenize(text):
+    """Turn one config file into a list of JSON-friendly tokens
+
+    ["var", name, value], ["source", value], ["submap", name] and
+    ["bind", flags, value, comment, line number]; everything else is dropped.
+    """
+    tokens = []
+    for number, raw in enumerate(text.splitlines(), start=1):
+        content, comment = split_comment(raw)
+        key, sep, value = content.partition('=')
+        if not sep:
+            continue
+        key = key.strip()
+        value = value.strip()
+
+        if key.startswith('$'):
+            tokens.append(["var", key[1:], value])
+        elif key == "source":
+            tokens.append(["source", value])
+        elif key == "submap":
+            tokens.append(["submap", value])
+        else:
+            match = BIND_RE.match(key)
+            if match:
+                tokens.append(["bind", match.group(1), value,
+                               comment.strip() if comment else None, number])
+    return tokens
+
+
+def _load_cache():
+    try:
+        with open(CACHE_FILE) as f:
+            data = json.load(f)
+        if data.get("version") == CACHE_VERSION:
+            return data["files"]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Cache Error: {e}", file=sys.stderr)
+    return {}
+
+
+def _save_cache(files):
+    try:
+        write_json(CACHE_FILE, {"version": CACHE_VERSION, "files": files}, separators=(',', ':'))
+    except Exception as e:
+        print(f"Cache Error: {e}", file=sys.stderr)
+
+
+class BindsLoader:
+    """Loads binds through a token cache that survives between loads and runs"""
+
+    def __init__(self, root=None):
+        if root is None:
+            root = ROOT_CONFIG if os.path.exists(ROOT_CONFIG) else BINDS_CONFIG
+        self.root = root
+        self.cache = None  # path -> {"mtime_ns", "size", "tokens"}
+        self.parsed = 0    # files tokenized by the last load()
+        self.files = []    # files read by the last load()
+
+    def _tokens(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        entry = self.cache.get(path)
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            return entry["tokens"]
+
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                tokens = tokenize(f.read())
+        except OSError:
+            return None
+        self.cache[path] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "tokens": tokens}
+        self.parsed += 1
+        return tokens
+
+    def load(self):
+        """Return a Config for the root file and everything it sources"""
+        if self.cache is None:
+            self.cache = _load_cache()
+        self.parsed = 0
+
+        state = {"variables": {}, "submap": None}
+        binds = []
+        files = []
+        self._walk(self.root, state, binds, files, set())
+
+        # Forget files that are no longer sourced
+        stale = set(self.cache) - set(files)
+        for path in stale:
+            del self.cache[path]
+        if self.parsed or stale:
+            _save_cache(self.cache)
+        self.files = files
+        return Config(binds, files)
+
+    def _walk(self, path, state, binds, files, visiting):
+        path = os.path.realpath(path)
+        if path in visiting:
+            return  # include cycle
+        tokens = self._tokens(path)
+        if tokens is None:
+            return
+        files.append(path)
+        visiting.add(path)
+
+        for token in tokens:
+            kind = token[0]
+            if kind == "var":
+                state["variables"][token[1]] = expand(token[2], state["variables"])
+            elif kind == "submap":
+                name = expand(token[1], state["variables"])
+                state["submap"] = None if name == "reset" else name
+            elif kind == "source":
+                pattern = os.path.expanduser(os.path.expandvars(expand(token[1], state["variables"])))
+                if not os.path.isabs(pattern):
+                    pattern = os.path.join(os.path.dirname(path), pattern)
+                for include in sorted(glob.glob(pattern)):
+                    self._walk(include, state, binds, files, visiting)
+            else:
+                bind = make_bind(token, state, path)
+                if bind:
+                    binds.append(bind)
+
+        visiting.discard(path)
+
+
+def expand(value, variables):
+    """Substitute $variables, longest names first like Hyprland does"""
+    if '$' not in value:
+        return value
+    for name in sorted(variables, key=len, reverse=True):
+        value = value.replace(f"${name}", variables[name])
+    return value
+
+
+def make_bind(token, state, path):
+    _, flags, value, comment, line = token
+    value = expand(value, state["variables"])
+    # bindd puts a description between the key and the dispatcher
+    fields = [f.strip() for f in value.split(',', 4 if 'd' in flags else 3)]
+    if len(fields) < 3:
+        return None
+
+    mods, key = fields[0], fields[1]
+    if 'd' in flags and len(fields) >= 4:
+        description, dispatcher = fields[2], fields[3]
+        params = fields[4] if len(fields) > 4 else ""
+    else:
+        description = None
+        dispatcher = fields[2]
+        params = fields[3] if len(fields) > 3 else ""
+    if comment:
+        description = comment
+
+    return Bind(flags, mods, key, dispatcher, params, description, state["submap"], path, line)
+
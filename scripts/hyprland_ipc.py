@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Minimal Hyprland IPC helpers for the scratchpad apps.
+
+Special workspaces are hidden by the compositor without unmapping their
+clients, so GTK never learns that its window went out of view. The event
+socket (.socket2.sock) reports every special workspace toggle as
+"activespecial>>NAME,MONITOR" (NAME is empty when the monitor's special
+workspace is closed), which is what SpecialWorkspaceWatcher follows.
+"""
+
+import json
+import os
+import socket
+import threading
+
+
+def socket_dir():
+    """Directory holding the current instance's sockets, or None outside Hyprland"""
+    signature = os.environ.get("HYPRLAND_INSTANCE_SIGNATURE")
+    if not signature:
+        return None
+    runtime = os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
+    path = os.path.join(runtime, "hypr", signature)
+    if os.path.isdir(path):
+        return path
+    # Hyprland before 0.40 kept its sockets in /tmp
+    legacy = os.path.join("/tmp", "hypr", signature)
+    return legacy if os.path.isdir(legacy) else None
+
+
+def request(command):
+    """Send one command to the request socket and return the raw reply"""
+    path = socket_dir()
+    if path is None:
+        raise OSError("Hyprland is not running")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(os.path.join(path, ".socket.sock"))
+        sock.sendall(command.encode())
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks).decode(errors="replace")
+
+
+class SpecialWorkspaceWatcher:
+    """Calls callback(visible) whenever a special workspace is shown or hidden
+
+    The callback runs on the watcher's thread; GTK users should hand it to
+    GLib.idle_add. Outside Hyprland the workspace is reported visible once
+    and nothing else happens.
+    """
+
+    def __init__(self, name, callback):
+        self.name = name if name.startswith("special:") else f"special:{name}"
+        self.callback = callback
+        self.shown_on = set()  # monitors currently showing the workspace
+        self.sock = None
+        self.thread = None
+
+    def start(self):
+        path = socket_dir()
+        try:
+            if path is None:
+                raise OSError("Hyprland is not running")
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(os.path.join(path, ".socket2.sock"))
+        except OSError:
+            self.sock = None
+            self.callback(True)
+            return
+
+        try:
+            monitors = json.loads(request("j/monitors"))
+            self.shown_on = {m["name"] for m in monitors
+                             if m.get("specialWorkspace", {}).get("name") == self.name}
+        except (OSError, ValueError, KeyError):
+            self.shown_on = set()
+        self.callback(bool(self.shown_on))
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        buffer = b""
+        while True:
+            try:
+                chunk = self.sock.recv(4096)
+            except OSError:
+                return
+            if not chunk:
+                return
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                self._on_event(line.decode(errors="replace"))
+
+    def _on_event(self, line):
+        event, _, data = line.partition(">>")
+        if event != "activespecial":
+            return
+        name, _, monitor = data.rpartition(",")
+        was_visible = bool(self.shown_on)
+        if name == self.name:
+            self.shown_on.add(monitor)
+        else:
+            self.shown_on.discard(monitor)
+        if bool(self.shown_on) != was_visible:
+            self.callback(bool(self.shown_on))
+
+    def stop(self):
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
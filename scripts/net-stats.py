@@ -1,42 +1,223 @@
 #!/usr/bin/env python3
 """
 Network Statistics Display Application using GTK/GObject
+
+Sampling and connection enumeration run on a worker thread that hands
+finished, immutable snapshots to the GTK main loop. Each UI tick applies
+them within a small time budget, and the worker sleeps while the window
+(or its special:netman workspace) is hidden.
+
+Usage: net-stats.py            open the window
+       net-stats.py --waybar   stream Waybar JSON without loading GTK
 """
 
-import gi
+import json
+import sys
 import threading
 import time
-import psutil
 import collections
 
-gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, GObject, GLib
+from net_sampler import CounterRates, NetSampler, interface_address, is_virtual
+
+# GTK and the GUI-only helpers are imported by load_gui(), so --waybar
+# starts without them
+Gtk = GLib = None
+
+def load_gui():
+    """Import GTK and the GUI-only helpers into the module namespace"""
+    global Gtk, GLib, SpecialWorkspaceWatcher, BandwidthTracker, ConnectionSource, ProcessCache
+    global RingBuffer, ThroughputGraph, HistoryStore
+    import gi
+    gi.require_version('Gtk', '3.0')
+    from gi.repository import Gtk, GLib
+    
+    from hyprland_ipc import SpecialWorkspaceWatcher
+    from net_conns import BandwidthTracker, ConnectionSource, ProcessCache
+    from net_graph import RingBuffer, ThroughputGraph
+    from net_history import HistoryStore
+
+# Connection store columns; *_SORT columns hold the numeric values used for sorting
+(COL_PID, COL_LOCAL, COL_REMOTE, COL_STATUS, COL_PROCESS, COL_PID_SORT,
+ COL_RATE, COL_RATE_SORT) = range(8)
+
+# Process store columns
+(PCOL_PID, PCOL_PROCESS, PCOL_DOWN, PCOL_UP, PCOL_CONNECTIONS, PCOL_PID_SORT,
+ PCOL_DOWN_SORT, PCOL_UP_SORT, PCOL_RATE_SORT) = range(9)
+
+# Interface store columns
+(ICOL_NAME, ICOL_DOWN, ICOL_UP, ICOL_PACKETS_IN, ICOL_PACKETS_OUT, ICOL_ERRORS, ICOL_DROPS,
+ ICOL_VIRTUAL, ICOL_COLOR, ICOL_DOWN_SORT, ICOL_UP_SORT, ICOL_ERROR_SORT,
+ ICOL_PACKETS_IN_SORT, ICOL_PACKETS_OUT_SORT) = range(14)
+
+ERROR_RATE_THRESHOLD = 1.0  # errors + drops per second that mark an interface
+WARNING_COLOR = "#e06c75"
 
-class NetworkStatsApp:
+# Auto-refresh choices for the connection list, in seconds (0 = off); rates
+# are averaged over the time between refreshes
+AUTO_REFRESH_CHOICES = [("Off", 0), ("2 s", 2), ("5 s", 5), ("10 s", 10), ("30 s", 30)]
+AUTO_REFRESH_DEFAULT = 1
+
+# Graph ranges: live ring buffer, or a resolution from the history store
+GRAPH_RANGES = [("Last minute", None), ("Last hour", "1s"), ("Last day", "1m"), ("Last month", "1h")]
+HISTORY_RELOAD = 60  # seconds between reloads of the day/month views
+
+SAMPLE_INTERVAL = 1.0  # seconds between interface samples
+WAYBAR_INTERVAL = 2.0  # seconds between Waybar updates
+UI_TICK_BUDGET = 0.008  # seconds of main-thread work per UI tick
+WORKSPACE = "netman"
+
+# Snapshots handed from the worker to the UI; never mutated after publishing
+StatsSnapshot = collections.namedtuple('StatsSnapshot', [
+    'interface', 'rx_rate', 'tx_rate', 'bytes_recv', 'bytes_sent', 'timestamp'
+])
+ConnectionSnapshot = collections.namedtuple('ConnectionSnapshot', ['rows', 'processes', 'total', 'backend', 'cache'])
+HistorySnapshot = collections.namedtuple('HistorySnapshot', ['resolution', 'interface', 'rx', 'tx'])
+InterfaceSnapshot = collections.namedtuple('InterfaceSnapshot', ['primary', 'rows'])
+
+class NetworkStats:
+    """Primary interface sampling and rate calculation, shared with --waybar"""
+    
     def __init__(self):
+        self.sampler = NetSampler()
+        self.last_stats = None
+        self.last_time = None
+    
+    def get_network_stats(self, sample=None):
+        """Get current network statistics, optionally from a sample_all() result"""
+        stats = {}
+        # The primary interface follows the default route
+        if sample is None:
+            primary_iface, counters = self.sampler.sample()
+        else:
+            primary_iface, all_counters = sample
+            counters = all_counters.get(primary_iface)
+        
+        if primary_iface and counters:
+            stats['interface'] = primary_iface
+            stats['bytes_sent'] = counters.bytes_sent
+            stats['bytes_recv'] = counters.bytes_recv
+            stats['packets_sent'] = counters.packets_sent
+            stats['packets_recv'] = counters.packets_recv
+            stats['errin'] = counters.errin
+            stats['errout'] = counters.errout
+            stats['dropin'] = counters.dropin
+            stats['dropout'] = counters.dropout
+        
+        return stats
+    
+    def format_bytes(self, bytes):
+        """Format bytes to human readable format"""
+        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+            if bytes < 1024.0:
+                return f"{bytes:.2f} {unit}"
+            bytes /= 1024.0
+        return f"{bytes:.2f} PB"
+    
+    def format_rate(self, bytes_per_sec):
+        """Format bytes per second"""
+        return f"{self.format_bytes(bytes_per_sec)}/s"
+    
+    def sample_stats(self, sample=None):
+        """Take one interface sample and return a StatsSnapshot, or None"""
+        current_stats = self.get_network_stats(sample)
+        current_time = time.monotonic()
+        snapshot = None
+        
+        if current_stats and self.last_stats and current_stats['interface'] == self.last_stats['interface']:
+            time_diff = current_time - self.last_time
+            
+            # Calculate rates
+            rx_rate = (current_stats['bytes_recv'] - self.last_stats['bytes_recv']) / time_diff
+            tx_rate = (current_stats['bytes_sent'] - self.last_stats['bytes_sent']) / time_diff
+            
+            snapshot = StatsSnapshot(
+                current_stats['interface'], rx_rate, tx_rate,
+                current_stats['bytes_recv'], current_stats['bytes_sent'], time.strftime('%H:%M:%S')
+            )
+        
+        # Store for next update (also after an interface change, so the
+        # next tick computes rates against the new interface)
+        self.last_stats = current_stats
+        self.last_time = current_time
+        return snapshot
+
+class NetworkStatsApp(NetworkStats):
+    def __init__(self, scratchpad=False):
+        load_gui()
+        super().__init__()
+        
         # Create main window
         self.window = Gtk.Window(title="Network Statistics")
         self.window.set_default_size(600, 400)
         self.window.set_border_width(10)
-        self.window.connect("destroy", Gtk.main_quit)
+        self.window.connect("destroy", self.on_destroy)
+        self.window.connect("map", self.on_map_changed, True)
+        self.window.connect("unmap", self.on_map_changed, False)
         
         # Initialize data storage
         self.history_length = 60  # Store last 60 data points
-        self.rx_history = collections.deque(maxlen=self.history_length)
-        self.tx_history = collections.deque(maxlen=self.history_length)
+        self.rx_history = RingBuffer(self.history_length)
+        self.tx_history = RingBuffer(self.history_length)
+        
+        # Sources, only touched by the worker thread (as is the sampler)
+        self.connection_source = ConnectionSource()
+        self.process_cache = ProcessCache()
+        self.bandwidth = BandwidthTracker()
+        self.counter_rates = CounterRates()
+        self.virtual_interfaces = {}  # iface -> is_virtual()
+        try:
+            self.history = HistoryStore()
+        except Exception as e:
+            print(f"History Error: {e}")
+            self.history = None
+        
+        # Graph range: None for the live buffers, else a history resolution
+        self.graph_range = None
+        self.range_rx = None
+        self.range_tx = None
+        self.history_loaded = 0
+        self.history_requested = None
+        
+        # (proto, laddr, raddr, pid) -> (store iter, row values), and pid/iface -> ...
+        self.connection_rows = {}
+        self.process_rows = {}
+        self.interface_rows = {}
+        self.connection_diff = None  # in-progress diff, resumed on the next tick
+        self.auto_refresh_id = None
         
-        # Get initial network stats
-        self.last_stats = self.get_network_stats()
-        self.last_time = time.time()
+        # Snapshot hand-off between the worker and the UI
+        self.snapshot_lock = threading.Lock()
+        self.pending_stats = None
+        self.pending_connections = None
+        self.pending_history = None
+        self.pending_interfaces = None
+        self.ui_tick_scheduled = False
+        
+        # Visibility: the window must be mapped and, when hosted on the
+        # special:netman scratchpad, that workspace must be shown
+        self.mapped = False
+        self.workspace_visible = True
+        self.active = threading.Event()
+        self.wake = threading.Event()
+        self.connections_requested = True
         
         # Create UI
         self.create_ui()
         
-        # Start update thread
+        # Start worker thread
         self.running = True
         self.update_thread = threading.Thread(target=self.update_stats)
         self.update_thread.daemon = True
         self.update_thread.start()
+        
+        # Started directly, the window lives on a normal workspace and only
+        # the map state applies
+        self.workspace_watcher = None
+        if scratchpad:
+            self.workspace_watcher = SpecialWorkspaceWatcher(
+                WORKSPACE, lambda visible: GLib.idle_add(self.on_workspace_visibility, visible)
+            )
+            self.workspace_watcher.start()
     
     def create_ui(self):
         """Create the user interface"""
@@ -71,42 +252,102 @@ class NetworkStatsApp:
         
         main_box.pack_start(current_frame, False, False, 5)
         
+        # Throughput graph over the rate history
+        graph_frame = Gtk.Frame(label="Throughput")
+        graph_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+        graph_box.set_margin_start(5)
+        graph_box.set_margin_end(5)
+        graph_box.set_margin_bottom(5)
+        graph_frame.add(graph_box)
+        
+        self.range_combo = Gtk.ComboBoxText()
+        for label, _ in GRAPH_RANGES:
+            self.range_combo.append_text(label)
+        self.range_combo.set_active(0)
+        self.range_combo.set_sensitive(self.history is not None)
+        self.range_combo.connect("changed", self.on_range_changed)
+        self.range_combo.set_halign(Gtk.Align.END)
+        graph_box.pack_start(self.range_combo, False, False, 0)
+        
+        self.graph = ThroughputGraph(self.rx_history, self.tx_history, self.format_rate)
+        graph_box.pack_start(self.graph, True, True, 0)
+        main_box.pack_start(graph_frame, False, False, 5)
+        
         # Details frame
-        details_frame = Gtk.Frame(label="Connection Details")
+        details_frame = Gtk.Frame(label="Details")
         details_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
         details_frame.add(details_box)
         
-        # TreeView for network connections
-        scrolled_window = Gtk.ScrolledWindow()
-        scrolled_window.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
-        scrolled_window.set_min_content_height(150)
+        # Connections and per-process throughput, both busiest first. Rows
+        # are diffed in place and sorting is left to the sort models so
+        # refreshes keep scroll and selection
+        notebook = Gtk.Notebook()
         
-        # Create list store and tree view
-        self.connection_store = Gtk.ListStore(str, str, str, str, str)
-        treeview = Gtk.TreeView(model=self.connection_store)
+        self.connection_store = Gtk.ListStore(str, str, str, str, str, int, str, float)
+        self.connection_sort = Gtk.TreeModelSort(model=self.connection_store)
+        self.connection_sort.set_sort_column_id(COL_RATE_SORT, Gtk.SortType.DESCENDING)
+        notebook.append_page(self.create_table(self.connection_sort, [
+            ("PID", COL_PID, COL_PID_SORT),
+            ("Local Address", COL_LOCAL, COL_LOCAL),
+            ("Remote Address", COL_REMOTE, COL_REMOTE),
+            ("Status", COL_STATUS, COL_STATUS),
+            ("Process", COL_PROCESS, COL_PROCESS),
+            ("Rate", COL_RATE, COL_RATE_SORT)
+        ]), Gtk.Label(label="Connections"))
         
-        # Create columns
-        columns = [
-            ("PID", 0),
-            ("Local Address", 1),
-            ("Remote Address", 2),
-            ("Status", 3),
-            ("Process", 4)
-        ]
+        self.process_store = Gtk.ListStore(str, str, str, str, int, int, float, float, float)
+        self.process_sort = Gtk.TreeModelSort(model=self.process_store)
+        self.process_sort.set_sort_column_id(PCOL_RATE_SORT, Gtk.SortType.DESCENDING)
+        notebook.append_page(self.create_table(self.process_sort, [
+            ("PID", PCOL_PID, PCOL_PID_SORT),
+            ("Process", PCOL_PROCESS, PCOL_PROCESS),
+            ("Download", PCOL_DOWN, PCOL_DOWN_SORT),
+            ("Upload", PCOL_UP, PCOL_UP_SORT),
+            ("Connections", PCOL_CONNECTIONS, PCOL_CONNECTIONS)
+        ]), Gtk.Label(label="Processes"))
         
-        for title, col_id in columns:
-            renderer = Gtk.CellRendererText()
-            column = Gtk.TreeViewColumn(title, renderer, text=col_id)
-            column.set_resizable(True)
-            treeview.append_column(column)
+        # Every interface, busiest first; virtual ones other than the
+        # primary can be hidden
+        interface_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+        self.hide_virtual = Gtk.CheckButton(label="Hide virtual interfaces")
+        self.hide_virtual.set_active(True)
+        self.hide_virtual.connect("toggled", lambda button: self.interface_filter.refilter())
+        interface_box.pack_start(self.hide_virtual, False, False, 0)
         
-        scrolled_window.add(treeview)
-        details_box.pack_start(scrolled_window, True, True, 0)
+        self.interface_store = Gtk.ListStore(str, str, str, str, str, str, str, bool, str, float, float, float, float, float)
+        self.interface_filter = self.interface_store.filter_new()
+        self.interface_filter.set_visible_func(self.interface_visible)
+        self.interface_sort = Gtk.TreeModelSort(model=self.interface_filter)
+        self.interface_sort.set_sort_column_id(ICOL_DOWN_SORT, Gtk.SortType.DESCENDING)
+        interface_box.pack_start(self.create_table(self.interface_sort, [
+            ("Interface", ICOL_NAME, ICOL_NAME),
+            ("Download", ICOL_DOWN, ICOL_DOWN_SORT),
+            ("Upload", ICOL_UP, ICOL_UP_SORT),
+            ("Packets In", ICOL_PACKETS_IN, ICOL_PACKETS_IN_SORT),
+            ("Packets Out", ICOL_PACKETS_OUT, ICOL_PACKETS_OUT_SORT),
+            ("Errors In/Out", ICOL_ERRORS, ICOL_ERROR_SORT),
+            ("Drops In/Out", ICOL_DROPS, ICOL_ERROR_SORT)
+        ], foreground=ICOL_COLOR), True, True, 0)
+        notebook.append_page(interface_box, Gtk.Label(label="Interfaces"))
+        
+        details_box.pack_start(notebook, True, True, 0)
+        
+        # Update button and auto-refresh interval
+        refresh_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=5)
         
-        # Update button
         self.update_button = Gtk.Button(label="Refresh Connections")
-        self.update_button.connect("clicked", self.update_connections)
-        details_box.pack_start(self.update_button, False, False, 5)
+        self.update_button.connect("clicked", self.request_connections)
+        refresh_box.pack_start(self.update_button, True, True, 0)
+        
+        refresh_box.pack_start(Gtk.Label(label="Auto-refresh:"), False, False, 0)
+        self.auto_refresh_combo = Gtk.ComboBoxText()
+        for label, _ in AUTO_REFRESH_CHOICES:
+            self.auto_refresh_combo.append_text(label)
+        self.auto_refresh_combo.set_active(AUTO_REFRESH_DEFAULT)
+        self.auto_refresh_combo.connect("changed", self.on_auto_refresh_changed)
+        refresh_box.pack_start(self.auto_refresh_combo, False, False, 0)
+        
+        details_box.pack_start(refresh_box, False, False, 5)
         
         main_box.pack_start(details_frame, True, True, 0)
         
@@ -115,134 +356,432 @@ class NetworkStatsApp:
         self.status_label.set_xalign(0)
         main_box.pack_start(self.status_label, False, False, 5)
     
-    def get_network_stats(self):
-        """Get current network statistics"""
-        stats = {}
-        net_io = psutil.net_io_counters(pernic=True)
+    def create_table(self, model, columns, foreground=None):
+        """Scrolled TreeView over model; columns are (title, text column, sort column)
+
+        foreground optionally names a model column holding each row's text color.
+        """
+        scrolled_window = Gtk.ScrolledWindow()
+        scrolled_window.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled_window.set_min_content_height(150)
         
-        # Find the primary interface (usually the one with most traffic)
-        primary_iface = None
-        max_bytes = 0
+        treeview = Gtk.TreeView(model=model)
+        for title, col_id, sort_id in columns:
+            renderer = Gtk.CellRendererText()
+            column = Gtk.TreeViewColumn(title, renderer, text=col_id)
+            if foreground is not None:
+                column.add_attribute(renderer, "foreground", foreground)
+            column.set_resizable(True)
+            column.set_sort_column_id(sort_id)
+            treeview.append_column(column)
         
-        for iface, data in net_io.items():
-            total_bytes = data.bytes_sent + data.bytes_recv
-            if total_bytes > max_bytes and iface != 'lo':  # Skip loopback
-                max_bytes = total_bytes
-                primary_iface = iface
+        scrolled_window.add(treeview)
+        return scrolled_window
+    
+    def snapshot_connections(self):
+        """Enumerate connections into a ConnectionSnapshot (worker thread)"""
+        # Netlink sock_diag dump, or psutil when netlink is unavailable
+        connections = self.connection_source.connections()
         
-        if primary_iface:
-            stats['interface'] = primary_iface
-            stats['bytes_sent'] = net_io[primary_iface].bytes_sent
-            stats['bytes_recv'] = net_io[primary_iface].bytes_recv
-            stats['packets_sent'] = net_io[primary_iface].packets_sent
-            stats['packets_recv'] = net_io[primary_iface].packets_recv
-            stats['errin'] = net_io[primary_iface].errin
-            stats['errout'] = net_io[primary_iface].errout
-            stats['dropin'] = net_io[primary_iface].dropin
-            stats['dropout'] = net_io[primary_iface].dropout
+        # Resolve every owning PID in one batch; only new PIDs hit /proc
+        process_names = self.process_cache.names(conn.pid for conn in connections)
         
-        return stats
-    
-    def format_bytes(self, bytes):
-        """Format bytes to human readable format"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if bytes < 1024.0:
-                return f"{bytes:.2f} {unit}"
-            bytes /= 1024.0
-        return f"{bytes:.2f} PB"
-    
-    def format_rate(self, bytes_per_sec):
-        """Format bytes per second"""
-        return f"{self.format_bytes(bytes_per_sec)}/s"
-    
-    def update_ui(self):
-        """Update UI with current statistics"""
-        current_stats = self.get_network_stats()
-        current_time = time.time()
+        # Byte deltas of every TCP socket since the previous dump
+        rates = self.bandwidth.update(connections)
         
-        if current_stats and self.last_stats:
-            time_diff = current_time - self.last_time
+        rows = {}
+        processes = {}  # pid -> [name, rx, tx, connections]
+        for conn in connections:
+            if conn.status == 'LISTEN':
+                continue  # Skip listening sockets for brevity
             
-            # Calculate rates
-            rx_rate = (current_stats['bytes_recv'] - self.last_stats['bytes_recv']) / time_diff
-            tx_rate = (current_stats['bytes_sent'] - self.last_stats['bytes_sent']) / time_diff
+            pid = str(conn.pid) if conn.pid else "N/A"
+            
+            # Get local address
+            if conn.laddr:
+                local_addr = f"{conn.laddr.ip}:{conn.laddr.port}"
+            else:
+                local_addr = "N/A"
+            
+            # Get remote address
+            if conn.raddr:
+                remote_addr = f"{conn.raddr.ip}:{conn.raddr.port}"
+            else:
+                remote_addr = "N/A"
+            
+            # Get process name
+            process_name = "N/A"
+            if conn.pid:
+                process_name = process_names.get(conn.pid, "Unknown")
+            
+            # Throughput from tcp_info; UDP sockets have no byte counters
+            rate = rates.get(conn.inode)
+            if rate:
+                rate_text = f"↓ {self.format_rate(rate[0])}  ↑ {self.format_rate(rate[1])}"
+                rate_total = rate[0] + rate[1]
+            else:
+                rate_text = ""
+                rate_total = -1.0
             
-            # Update history
-            self.rx_history.append(rx_rate)
-            self.tx_history.append(tx_rate)
+            key = (conn.proto, conn.laddr, conn.raddr, conn.pid)
+            rows[key] = (pid, local_addr, remote_addr, conn.status, process_name, conn.pid or 0,
+                         rate_text, rate_total)
             
-            # Update labels
-            self.interface_label.set_text(f"Interface: {current_stats['interface']}")
-            self.rx_rate_label.set_text(f"Download: {self.format_rate(rx_rate)}")
-            self.tx_rate_label.set_text(f"Upload: {self.format_rate(tx_rate)}")
-            self.total_rx_label.set_text(f"Total Downloaded: {self.format_bytes(current_stats['bytes_recv'])}")
-            self.total_tx_label.set_text(f"Total Uploaded: {self.format_bytes(current_stats['bytes_sent'])}")
+            if conn.pid:
+                totals = processes.setdefault(conn.pid, [process_name, None, None, 0])
+                totals[3] += 1
+                if rate:
+                    totals[1] = (totals[1] or 0.0) + rate[0]
+                    totals[2] = (totals[2] or 0.0) + rate[1]
+        
+        process_rows = {}
+        for pid, (name, rx, tx, count) in processes.items():
+            if rx is None:
+                process_rows[pid] = (str(pid), name, "N/A", "N/A", count, pid, -1.0, -1.0, -1.0)
+            else:
+                process_rows[pid] = (str(pid), name, self.format_rate(rx), self.format_rate(tx),
+                                     count, pid, rx, tx, rx + tx)
+        
+        return ConnectionSnapshot(rows, process_rows, len(connections), self.connection_source.backend,
+                                  self.process_cache.stats())
+    
+    def update_stats(self):
+        """Worker thread: sample every second and enumerate connections on request"""
+        next_sample = 0
+        while self.running:
+            if not self.active.is_set():
+                self.active.wait()
+                # Rates across a pause would be averages; start over
+                self.last_stats = None
+                self.counter_rates.reset()
+                if self.history:
+                    self.history.reset()
+                next_sample = 0
+                continue
             
-            # Update status
-            self.status_label.set_text(f"Last update: {time.strftime('%H:%M:%S')}")
+            if self.connections_requested:
+                self.connections_requested = False
+                try:
+                    self.publish(connections=self.snapshot_connections())
+                except Exception as e:
+                    print(f"Error updating connections: {e}")
             
-            # Store for next update
-            self.last_stats = current_stats
-            self.last_time = current_time
+            now = time.monotonic()
+            if now >= next_sample:
+                next_sample = now + SAMPLE_INTERVAL
+                # One read of /proc/net/dev feeds the labels, the interface
+                # table and the history store
+                sample = self.sampler.sample_all()
+                self.publish(stats=self.sample_stats(sample), interfaces=self.snapshot_interfaces(sample))
+                self.record_history(sample[1])
+            
+            if self.history_requested:
+                resolution, self.history_requested = self.history_requested, None
+                self.publish(history=self.load_history(resolution))
+            
+            self.wake.wait(max(0, next_sample - time.monotonic()))
+            self.wake.clear()
+        
+        if self.history:
+            self.history.close()
     
-    def update_connections(self, widget=None):
-        """Update network connections list"""
-        # Clear existing entries
-        self.connection_store.clear()
+    def snapshot_interfaces(self, sample):
+        """Per-interface rates for the interface table (worker thread)"""
+        primary, counters = sample
+        rates = self.counter_rates.update(counters)
+        if not rates:
+            return None
         
+        rows = {}
+        for iface, r in rates.items():
+            virtual = self.virtual_interfaces.get(iface)
+            if virtual is None:
+                virtual = self.virtual_interfaces[iface] = is_virtual(iface)
+            errors = r.errin + r.errout + r.dropin + r.dropout
+            rows[iface] = (
+                iface,
+                self.format_rate(r.bytes_recv),
+                self.format_rate(r.bytes_sent),
+                f"{r.packets_recv:.0f}/s",
+                f"{r.packets_sent:.0f}/s",
+                f"{r.errin:.1f} / {r.errout:.1f}",
+                f"{r.dropin:.1f} / {r.dropout:.1f}",
+                virtual and iface != primary,
+                WARNING_COLOR if errors >= ERROR_RATE_THRESHOLD else None,
+                r.bytes_recv,
+                r.bytes_sent,
+                errors,
+                r.packets_recv,
+                r.packets_sent
+            )
+        return InterfaceSnapshot(primary, rows)
+    
+    def record_history(self, counters):
+        """Add this tick's counters to the history store (worker thread)"""
+        if not self.history:
+            return
         try:
-            connections = psutil.net_connections(kind='inet')
-            
-            for conn in connections:
-                if conn.status == 'LISTEN':
-                    continue  # Skip listening sockets for brevity
-                
-                pid = str(conn.pid) if conn.pid else "N/A"
-                
-                # Get local address
-                if conn.laddr:
-                    local_addr = f"{conn.laddr.ip}:{conn.laddr.port}"
-                else:
-                    local_addr = "N/A"
-                
-                # Get remote address
-                if conn.raddr:
-                    remote_addr = f"{conn.raddr.ip}:{conn.raddr.port}"
-                else:
-                    remote_addr = "N/A"
-                
-                # Get process name
-                process_name = "N/A"
-                if conn.pid:
-                    try:
-                        p = psutil.Process(conn.pid)
-                        process_name = p.name()
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        process_name = "Unknown"
-                
-                self.connection_store.append([
-                    pid,
-                    local_addr,
-                    remote_addr,
-                    conn.status,
-                    process_name
-                ])
+            self.history.record(counters)
         except Exception as e:
-            print(f"Error updating connections: {e}")
+            print(f"History Error: {e}")
     
-    def update_stats(self):
-        """Background thread to update statistics"""
-        while self.running:
-            time.sleep(1)  # Update every second
-            GLib.idle_add(self.update_ui)
+    def load_history(self, resolution):
+        """Read one stored range for the primary interface (worker thread)"""
+        interface = self.last_stats.get('interface') if self.last_stats else self.sampler.primary
+        if not interface:
+            return None
+        try:
+            rx, tx = self.history.rates(interface, resolution)
+        except Exception as e:
+            print(f"History Error: {e}")
+            return None
+        return HistorySnapshot(resolution, interface, tuple(rx), tuple(tx))
+    
+    def publish(self, stats=None, connections=None, history=None, interfaces=None):
+        """Hand a snapshot to the UI; a newer snapshot replaces an unapplied one"""
+        with self.snapshot_lock:
+            if stats:
+                self.pending_stats = stats
+            if connections:
+                self.pending_connections = connections
+            if history:
+                self.pending_history = history
+            if interfaces:
+                self.pending_interfaces = interfaces
+            if self.ui_tick_scheduled:
+                return
+            self.ui_tick_scheduled = True
+        GLib.idle_add(self.ui_tick)
+    
+    def ui_tick(self):
+        """Apply pending snapshots, spending at most UI_TICK_BUDGET per call"""
+        deadline = time.monotonic() + UI_TICK_BUDGET
+        with self.snapshot_lock:
+            stats, self.pending_stats = self.pending_stats, None
+            connections, self.pending_connections = self.pending_connections, None
+            history, self.pending_history = self.pending_history, None
+            interfaces, self.pending_interfaces = self.pending_interfaces, None
+        
+        if interfaces:
+            # A handful of rows; applied in one go
+            for _ in self.apply_rows(self.interface_store, self.interface_rows, interfaces.rows):
+                pass
+        if history:
+            self.apply_history(history)
+        if stats:
+            self.apply_stats(stats)
+        if connections:
+            # A newer snapshot supersedes a partially applied one
+            self.connection_diff = self.apply_connections(connections)
+        
+        if self.connection_diff:
+            for _ in self.connection_diff:
+                if time.monotonic() >= deadline:
+                    break
+            else:
+                self.connection_diff = None
+        
+        with self.snapshot_lock:
+            pending = (self.pending_stats, self.pending_connections, self.pending_history, self.pending_interfaces)
+            if self.connection_diff or any(pending):
+                return True
+            self.ui_tick_scheduled = False
+            return False
+    
+    def apply_stats(self, stats):
+        # Update history
+        self.rx_history.append(stats.rx_rate)
+        self.tx_history.append(stats.tx_rate)
+        if self.graph_range is None:
+            self.graph.refresh()
+        elif self.graph_range == "1s" and self.range_rx is not None:
+            # The hour view has one-second buckets, so live samples extend it
+            self.range_rx.append(stats.rx_rate)
+            self.range_tx.append(stats.tx_rate)
+            self.graph.refresh()
+        elif time.monotonic() - self.history_loaded >= HISTORY_RELOAD:
+            self.request_history(self.graph_range)
+        
+        # Update labels
+        self.interface_label.set_text(f"Interface: {stats.interface}")
+        self.rx_rate_label.set_text(f"Download: {self.format_rate(stats.rx_rate)}")
+        self.tx_rate_label.set_text(f"Upload: {self.format_rate(stats.tx_rate)}")
+        self.total_rx_label.set_text(f"Total Downloaded: {self.format_bytes(stats.bytes_recv)}")
+        self.total_tx_label.set_text(f"Total Uploaded: {self.format_bytes(stats.bytes_sent)}")
+        
+        # Update status
+        self.status_label.set_text(f"Last update: {stats.timestamp}")
+    
+    def apply_history(self, snapshot):
+        if snapshot.resolution != self.graph_range:
+            return  # the range was changed again while loading
+        self.range_rx = RingBuffer(len(snapshot.rx))
+        self.range_tx = RingBuffer(len(snapshot.tx))
+        self.range_rx.extend(snapshot.rx)
+        self.range_tx.extend(snapshot.tx)
+        self.graph.set_buffers(self.range_rx, self.range_tx)
+    
+    def apply_rows(self, store, index, rows):
+        """Diff {key: row} against store, yielding after each row op
+
+        index maps key -> (store iter, row values) and is kept in step with the store.
+        """
+        # Remove closed rows
+        for key in [k for k in index if k not in rows]:
+            tree_iter, _ = index.pop(key)
+            store.remove(tree_iter)
+            yield
+        
+        # Insert new rows and update changed columns of existing ones
+        for key, row in rows.items():
+            existing = index.get(key)
+            if existing is None:
+                index[key] = (store.append(row), row)
+                yield
+                continue
+            
+            tree_iter, old_row = existing
+            if old_row != row:
+                changed = [i for i, value in enumerate(row) if value != old_row[i]]
+                store.set(tree_iter, changed, [row[i] for i in changed])
+                index[key] = (tree_iter, row)
+                yield
+    
+    def apply_connections(self, snapshot):
+        """Apply a ConnectionSnapshot to both tables, yielding after each row op"""
+        changes = 0
+        for store, index, rows in ((self.connection_store, self.connection_rows, snapshot.rows),
+                                   (self.process_store, self.process_rows, snapshot.processes)):
+            for _ in self.apply_rows(store, index, rows):
+                changes += 1
+                yield
+        
+        cache = snapshot.cache
+        self.status_label.set_tooltip_text(
+            f"Connections: {snapshot.total} via {snapshot.backend} "
+            f"({changes} rows changed)\n"
+            f"Process cache: {cache['entries']} entries, {cache['hits']} hits, "
+            f"{cache['misses']} misses, {cache['evictions']} evicted"
+        )
+    
+    def interface_visible(self, model, tree_iter, data=None):
+        return not (self.hide_virtual.get_active() and model[tree_iter][ICOL_VIRTUAL])
+    
+    def request_connections(self, widget=None):
+        """Ask the worker for a fresh connection snapshot"""
+        self.connections_requested = True
+        self.wake.set()
+    
+    def request_history(self, resolution):
+        """Ask the worker to load a stored range for the graph"""
+        self.history_loaded = time.monotonic()
+        self.history_requested = resolution
+        self.wake.set()
+    
+    def on_range_changed(self, combo):
+        self.graph_range = GRAPH_RANGES[combo.get_active()][1]
+        self.range_rx = self.range_tx = None
+        if self.graph_range is None:
+            self.graph.set_buffers(self.rx_history, self.tx_history)
+        else:
+            self.request_history(self.graph_range)
+    
+    def on_auto_refresh_changed(self, combo):
+        self.update_auto_refresh()
+    
+    def update_auto_refresh(self):
+        """(Re)arm the auto-refresh timer; it only runs while the window is visible"""
+        if self.auto_refresh_id:
+            GLib.source_remove(self.auto_refresh_id)
+            self.auto_refresh_id = None
+        
+        interval = AUTO_REFRESH_CHOICES[self.auto_refresh_combo.get_active()][1]
+        if interval and self.active.is_set():
+            self.auto_refresh_id = GLib.timeout_add_seconds(interval, self.on_auto_refresh)
+    
+    def on_auto_refresh(self):
+        self.request_connections()
+        return True
+    
+    def on_map_changed(self, widget, mapped):
+        self.mapped = mapped
+        self.update_active()
+    
+    def on_workspace_visibility(self, visible):
+        self.workspace_visible = visible
+        self.update_active()
+        return False
+    
+    def update_active(self):
+        """Run the worker only while the window can actually be seen"""
+        if self.mapped and self.workspace_visible:
+            if not self.active.is_set():
+                self.active.set()
+                self.wake.set()
+        else:
+            self.active.clear()
+        self.update_auto_refresh()
+    
+    def on_destroy(self, widget):
+        self.running = False
+        self.active.set()
+        self.wake.set()
+        if self.workspace_watcher is not None:
+            self.workspace_watcher.stop()
+        # Only quit a main loop of our own, not the scratchpads.py host's
+        if Gtk.main_level():
+            Gtk.main_quit()
     
     def run(self):
         """Run the application"""
         self.window.show_all()
-        self.update_connections()  # Initial update
         Gtk.main()
+        # Let the worker commit the history store before exiting
+        self.update_thread.join(timeout=2)
+
+def format_waybar(stats, snapshot):
+    """One Waybar JSON object for the primary interface"""
+    if snapshot is None:
+        return {
+            "text": "No Internet",
+            "tooltip": "No active interface",
+            "class": "disconnected"
+        }
+    
+    address = interface_address(snapshot.interface) or "no IPv4 address"
+    tooltip = "\n".join([
+        f"Interface: {snapshot.interface} ({address})",
+        f"Download: {stats.format_rate(snapshot.rx_rate)}",
+        f"Upload: {stats.format_rate(snapshot.tx_rate)}",
+        f"Total Downloaded: {stats.format_bytes(snapshot.bytes_recv)}",
+        f"Total Uploaded: {stats.format_bytes(snapshot.bytes_sent)}"
+    ])
+    return {
+        "text": f"↓ {stats.format_rate(snapshot.rx_rate)}  ↑ {stats.format_rate(snapshot.tx_rate)}",
+        "tooltip": tooltip,
+        "class": "connected"
+    }
+
+def run_waybar():
+    """Print one JSON line per WAYBAR_INTERVAL for a continuous custom module"""
+    stats = NetworkStats()
+    stats.sample_stats()  # baseline for the first rate
+    next_tick = time.monotonic()
+    while True:
+        next_tick += WAYBAR_INTERVAL
+        time.sleep(max(0, next_tick - time.monotonic()))
+        snapshot = stats.sample_stats()
+        if snapshot is None and stats.last_stats:
+            continue  # interface just changed; the next tick has a rate
+        print(json.dumps(format_waybar(stats, snapshot)), flush=True)
 
 def main():
+    if "--waybar" in sys.argv:
+        try:
+            run_waybar()
+        except (KeyboardInterrupt, BrokenPipeError):
+            pass
+        return
     app = NetworkStatsApp()
     app.run()
 
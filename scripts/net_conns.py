@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Socket enumeration for the connections table.
+
+Sockets are dumped from the kernel with NETLINK_SOCK_DIAG, which returns
+every TCP/UDP socket in a few syscalls instead of walking /proc/*/fd like
+psutil.net_connections does. Owning PIDs are found through an inode index
+that only rescans processes it hasn't seen before (or when a socket can't
+be placed). If netlink isn't available the psutil path is used instead.
+
+TCP sockets are dumped with tcp_info attached, whose bytes_acked and
+bytes_received counters give per-connection throughput between dumps.
+"""
+
+import collections
+import ipaddress
+import os
+import socket
+import struct
+import time
+
+NETLINK_SOCK_DIAG = 4
+SOCK_DIAG_BY_FAMILY = 20
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+NLMSG_HDR = struct.Struct("=IHHII")
+# inet_diag_req_v2: family, protocol, ext, pad, states, then inet_diag_sockid
+INET_DIAG_REQ = struct.Struct("=BBBxI48s")
+# inet_diag_msg: family, state, timer, retrans, sockid (ports big endian),
+# expires, rqueue, wqueue, uid, inode
+INET_DIAG_MSG = struct.Struct("=BBBB2s2s16s16sI8sIIIII")
+RTATTR = struct.Struct("=HH")
+
+# Attribute carrying struct tcp_info, requested with bit (INET_DIAG_INFO - 1) of ext
+INET_DIAG_INFO = 2
+# tcpi_bytes_acked and tcpi_bytes_received (Linux 4.1+)
+TCP_INFO_BYTES = struct.Struct("=QQ")
+TCP_INFO_BYTES_OFFSET = 120
+
+ALL_STATES = 0xFFFFFFFF
+
+TCP_STATES = {
+    1: 'ESTABLISHED', 2: 'SYN_SENT', 3: 'SYN_RECV', 4: 'FIN_WAIT1', 5: 'FIN_WAIT2',
+    6: 'TIME_WAIT', 7: 'CLOSE', 8: 'CLOSE_WAIT', 9: 'LAST_ACK', 10: 'LISTEN', 11: 'CLOSING'
+}
+
+# Same shape as psutil's connection tuples, plus the protocol, inode and
+# byte counters (None where the kernel doesn't report them, e.g. UDP)
+Addr = collections.namedtuple('Addr', ['ip', 'port'])
+Connection = collections.namedtuple(
+    'Connection', ['proto', 'laddr', 'raddr', 'status', 'pid', 'inode', 'bytes_sent', 'bytes_recv'],
+    defaults=(None, None)
+)
+
+
+def _addr(family, raw, port):
+    if family == socket.AF_INET:
+        ip = socket.inet_ntop(family, raw[:4])
+    else:
+        ip = socket.inet_ntop(family, raw)
+        # Show v4-mapped addresses the way psutil does
+        mapped = ipaddress.IPv6Address(raw).ipv4_mapped
+        if mapped:
+            ip = str(mapped)
+    return Addr(ip, port)
+
+
+class InodeIndex:
+    """Maps socket inodes to PIDs, rescanning /proc only for what's new"""
+
+    def __init__(self):
+        self.owner = {}          # inode -> pid
+        self.scanned = set()     # pids whose fd table has been read
+        self.unowned = set()     # inodes no readable process holds
+
+    def _scan(self, pid):
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            return
+        for fd in fds:
+            try:
+                target = os.readlink(f"{fd_dir}/{fd}")
+            except OSError:
+                continue
+            if target.startswith("socket:["):
+                self.owner[int(target[8:-1])] = pid
+        self.scanned.add(pid)
+
+    def _pid_uid(self, pid):
+        try:
+            return os.stat(f"/proc/{pid}").st_uid
+        except OSError:
+            return None
+
+    def resolve(self, sockets):
+        """Return {inode: pid} for a {inode: uid} mapping (unknown ones are absent)"""
+        missing = {i: uid for i, uid in sockets.items()
+                   if i and i not in self.owner and i not in self.unowned}
+        if missing:
+            try:
+                pids = [int(p) for p in os.listdir("/proc") if p.isdigit()]
+            except OSError:
+                pids = []
+            live = set(pids)
+
+            # Forget processes that have exited
+            self.scanned &= live
+            self.owner = {inode: pid for inode, pid in self.owner.items() if pid in live}
+
+            # New processes first
+            for pid in pids:
+                if pid not in self.scanned:
+                    self._scan(pid)
+
+            # Sockets opened by already known processes: rescan only the
+            # processes running as the socket's owner
+            uids = {uid for i, uid in missing.items() if i not in self.owner}
+            if uids:
+                for pid in pids:
+                    if None in uids or self._pid_uid(pid) in uids:
+                        self._scan(pid)
+
+            self.unowned.update(i for i in missing if i not in self.owner)
+
+        # Drop sockets that have been closed
+        self.owner = {inode: pid for inode, pid in self.owner.items() if inode in sockets}
+        self.unowned &= sockets.keys()
+        return self.owner
+
+
+class ProcessCache:
+    """Process names keyed by (pid, start time)
+
+    A PID that was present in the previous batch is a hit without touching
+    /proc. A PID that is new, or that comes back after an absence, has its
+    /proc/<pid>/stat read once; the start time in there tells a reused PID
+    apart from the process that was cached. PIDs that drop out of a batch
+    are evicted as soon as their process has exited.
+
+    The start time is deliberately not re-checked for PIDs seen in the
+    previous batch: the name comes from the same stat read, so checking
+    would make every lookup a miss. A PID that exits and is reused between
+    two consecutive batches (one auto-refresh interval) shows the old name
+    until it drops out of a batch; with PIDs allocated sequentially up to
+    pid_max, that takes a full wrap of the PID space within the interval.
+    """
+
+    SWEEP_EVERY = 30  # batches between checks of idle entries
+
+    def __init__(self):
+        self.entries = {}    # pid -> (start_time, name)
+        self.previous = set()
+        self.batches = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _read_stat(self, pid):
+        """Return (start_time, comm) from /proc/<pid>/stat, or None"""
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        # comm may itself contain spaces and parentheses
+        head, _, tail = data.rpartition(b")")
+        comm = head.partition(b"(")[2].decode(errors="replace")
+        fields = tail.split()
+        # starttime is field 22; fields after comm start at field 3
+        return int(fields[19]), comm
+
+    def names(self, pids):
+        """Return {pid: name} for a batch of PIDs"""
+        batch = {pid for pid in pids if pid}
+        result = {}
+        for pid in batch:
+            entry = self.entries.get(pid)
+            if entry and pid in self.previous:
+                self.hits += 1
+                result[pid] = entry[1]
+                continue
+
+            info = self._read_stat(pid)
+            if info is None:
+                self.misses += 1
+                self.entries.pop(pid, None)
+                continue
+            if entry and entry[0] == info[0]:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.entries[pid] = info
+            result[pid] = self.entries[pid][1]
+
+        self.batches += 1
+        if self.batches % self.SWEEP_EVERY == 0:
+            idle = set(self.entries) - batch
+        else:
+            idle = self.previous - batch
+        for pid in idle:
+            if pid in self.entries and not os.path.exists(f"/proc/{pid}"):
+                del self.entries[pid]
+                self.evictions += 1
+
+        self.previous = batch
+        return result
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+class BandwidthTracker:
+    """Per-socket byte rates from the counters of successive dumps"""
+
+    def __init__(self):
+        self.previous = {}   # inode -> (bytes_recv, bytes_sent)
+        self.previous_time = None
+
+    def update(self, connections, now=None):
+        """Return {inode: (rx bytes/s, tx bytes/s)} since the previous call"""
+        now = time.monotonic() if now is None else now
+        elapsed = now - self.previous_time if self.previous_time else None
+        rates = {}
+        current = {}
+        for conn in connections:
+            if conn.bytes_recv is None or not conn.inode:
+                continue
+            counters = (conn.bytes_recv, conn.bytes_sent)
+            current[conn.inode] = counters
+            if not elapsed:
+                continue
+            # A socket missing from the previous dump was opened since then
+            prev = self.previous.get(conn.inode, (0, 0))
+            rates[conn.inode] = (max(0, counters[0] - prev[0]) / elapsed,
+                                 max(0, counters[1] - prev[1]) / elapsed)
+        self.previous = current
+        self.previous_time = now
+        return rates
+
+
+class SockDiag:
+    """Dumps TCP/UDP sockets for IPv4 and IPv6 over NETLINK_SOCK_DIAG"""
+
+    QUERIES = (
+        ('tcp', socket.AF_INET, socket.IPPROTO_TCP),
+        ('tcp6', socket.AF_INET6, socket.IPPROTO_TCP),
+        ('udp', socket.AF_INET, socket.IPPROTO_UDP),
+        ('udp6', socket.AF_INET6, socket.IPPROTO_UDP),
+    )
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_SOCK_DIAG)
+        self.sock.bind((0, 0))
+        self.seq = 0
+
+    def dump(self, family, protocol, ext=0):
+        """Yield (inet_diag_msg fields, {attr type: payload}) for one family/protocol"""
+        self.seq += 1
+        req = INET_DIAG_REQ.pack(family, protocol, ext, ALL_STATES, b"\0" * 48)
+        hdr = NLMSG_HDR.pack(NLMSG_HDR.size + len(req), SOCK_DIAG_BY_FAMILY,
+                             NLM_F_REQUEST | NLM_F_DUMP, self.seq, 0)
+        self.sock.send(hdr + req)
+
+        while True:
+            data = self.sock.recv(65536)
+            offset = 0
+            while offset + NLMSG_HDR.size <= len(data):
+                length, msg_type, _, seq, _ = NLMSG_HDR.unpack_from(data, offset)
+                if length < NLMSG_HDR.size:
+                    return
+                if msg_type == NLMSG_DONE:
+                    return
+                if msg_type == NLMSG_ERROR:
+                    errno = -struct.unpack_from("=i", data, offset + NLMSG_HDR.size)[0]
+                    raise OSError(errno, os.strerror(errno))
+
+                body = offset + NLMSG_HDR.size
+                msg = INET_DIAG_MSG.unpack_from(data, body)
+                attrs = {}
+                pos = body + INET_DIAG_MSG.size
+                end = offset + length
+                while pos + RTATTR.size <= end:
+                    attr_len, attr_type = RTATTR.unpack_from(data, pos)
+                    if attr_len < RTATTR.size:
+                        break
+                    attrs[attr_type] = data[pos + RTATTR.size:pos + attr_len]
+                    pos += (attr_len + 3) & ~3
+                yield msg, attrs
+                offset += (length + 3) & ~3
+
+    def close(self):
+        self.sock.close()
+
+
+class ConnectionSource:
+    """Lists inet connections, preferring netlink and falling back to psutil"""
+
+    def __init__(self):
+        self.index = InodeIndex()
+        try:
+            self.diag = SockDiag()
+        except OSError:
+            self.diag = None
+
+    @property
+    def backend(self):
+        return "netlink" if self.diag else "psutil"
+
+    def _netlink_sockets(self):
+        for proto, family, protocol in SockDiag.QUERIES:
+            ext = 1 << (INET_DIAG_INFO - 1) if protocol == socket.IPPROTO_TCP else 0
+            for msg, attrs in self.diag.dump(family, protocol, ext):
+                yield proto, family, msg, attrs
+
+    def connections(self):
+        """Return a list of Connection tuples for all TCP/UDP sockets"""
+        if self.diag:
+            try:
+                return self._from_netlink(self._netlink_sockets())
+            except OSError:
+                self.diag.close()
+                self.diag = None
+        return self._from_psutil()
+
+    def _from_netlink(self, sockets):
+        raw = []
+        for proto, family, msg, attrs in sockets:
+            fam, state, _, _, sport, dport, src, dst, _, _, _, _, _, uid, inode = msg
+            laddr = _addr(fam, src, int.from_bytes(sport, 'big'))
+            rport = int.from_bytes(dport, 'big')
+            raddr = _addr(fam, dst, rport) if rport else ()
+            status = TCP_STATES.get(state, 'NONE') if proto.startswith('tcp') else 'NONE'
+            sent = recv = None
+            info = attrs.get(INET_DIAG_INFO)
+            if info and len(info) >= TCP_INFO_BYTES_OFFSET + TCP_INFO_BYTES.size:
+                sent, recv = TCP_INFO_BYTES.unpack_from(info, TCP_INFO_BYTES_OFFSET)
+            raw.append((proto, laddr, raddr, status, inode, uid, sent, recv))
+
+        owners = self.index.resolve({r[4]: r[5] for r in raw})
+        return [Connection(proto, laddr, raddr, status, owners.get(inode), inode, sent, recv)
+                for proto, laddr, raddr, status, inode, _, sent, recv in raw]
+
+    def _from_psutil(self):
+        import psutil
+
+        connections = []
+        for conn in psutil.net_connections(kind='inet'):
+            proto = ('tcp' if conn.type == socket.SOCK_STREAM else 'udp') + ('6' if conn.family == socket.AF_INET6 else '')
+            connections.append(Connection(proto, conn.laddr, conn.raddr, conn.status, conn.pid, None))
+        return connections
+
+    def close(self):
+        if self.diag:
+            self.diag.close()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Throughput graph for net-stats.py.
+
+Rates live in fixed-size array('d') ring buffers, so history costs the same
+memory from the first sample to the millionth, and each series is drawn as a
+single Cairo path straight out of the buffer. A new sample only invalidates
+the plot area; the legend strip is redrawn when the scale label changes.
+"""
+
+from array import array
+
+import gi
+
+gi.require_version('Gtk', '3.0')
+gi.require_version('Gdk', '3.0')
+from gi.repository import Gdk, Gtk
+
+LEGEND_HEIGHT = 18
+RX_COLOR = (0.36, 0.78, 0.48)
+TX_COLOR = (0.36, 0.60, 0.92)
+
+
+class RingBuffer:
+    """Fixed-size float history, oldest value first"""
+
+    def __init__(self, size):
+        self.size = size
+        self.data = array('d', bytes(8 * size))
+        self.head = 0   # next slot to write
+        self.count = 0
+
+    def append(self, value):
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        """index 0 is the oldest value"""
+        return self.data[(self.head - self.count + index) % self.size]
+
+    def max(self):
+        return max(self.data) if self.count == self.size else max(self.data[:self.count], default=0.0)
+
+
+def nice_scale(value):
+    """Round a peak rate up to 1, 2 or 5 x 10^n KB/s"""
+    scale = 1024.0
+    while True:
+        for factor in (1, 2, 5):
+            if scale * factor >= value:
+                return scale * factor
+        scale *= 10
+
+
+class ThroughputGraph(Gtk.DrawingArea):
+    """Area chart of download and upload rates"""
+
+    def __init__(self, rx, tx, format_rate):
+        super().__init__()
+        self.rx = rx
+        self.tx = tx
+        self.format_rate = format_rate
+        self.scale = nice_scale(0)
+        self.set_size_request(-1, 120)
+        self.connect("draw", self.on_draw)
+
+    def set_buffers(self, rx, tx):
+        """Switch to another pair of buffers, e.g. a stored history range"""
+        self.rx = rx
+        self.tx = tx
+        self.scale = nice_scale(max(rx.max(), tx.max()))
+        self.queue_draw()
+
+    def refresh(self):
+        """Call after appending to the buffers"""
+        scale = nice_scale(max(self.rx.max(), self.tx.max()))
+        if scale != self.scale:
+            self.scale = scale
+            self.queue_draw()
+            return
+        allocation = self.get_allocation()
+        self.queue_draw_area(0, LEGEND_HEIGHT, allocation.width, allocation.height - LEGEND_HEIGHT)
+
+    def on_draw(self, widget, cr):
+        width = widget.get_allocated_width()
+        height = widget.get_allocated_height()
+        plot_height = height - LEGEND_HEIGHT
+        if plot_height <= 0:
+            return False
+
+        _, clip = Gdk.cairo_get_clip_rectangle(cr)
+        if clip.y < LEGEND_HEIGHT:
+            self._draw_legend(cr, width)
+
+        # Plot background and mid line
+        cr.set_source_rgba(1, 1, 1, 0.04)
+        cr.rectangle(0, LEGEND_HEIGHT, width, plot_height)
+        cr.fill()
+        cr.set_source_rgba(1, 1, 1, 0.12)
+        cr.set_line_width(1)
+        cr.move_to(0, LEGEND_HEIGHT + plot_height / 2 + 0.5)
+        cr.line_to(width, LEGEND_HEIGHT + plot_height / 2 + 0.5)
+        cr.stroke()
+
+        for buffer, color in ((self.rx, RX_COLOR), (self.tx, TX_COLOR)):
+            self._draw_series(cr, buffer, color, width, plot_height)
+        return False
+
+    def _draw_series(self, cr, buffer, color, width, plot_height):
+        count = len(buffer)
+        if count < 2:
+            return
+        bottom = LEGEND_HEIGHT + plot_height
+        step = width / (buffer.size - 1)
+        # Newest sample sits on the right edge
+        x = width - (count - 1) * step
+        y_scale = plot_height / self.scale
+
+        cr.move_to(x, bottom - min(buffer[0], self.scale) * y_scale)
+        for i in range(1, count):
+            cr.line_to(x + i * step, bottom - min(buffer[i], self.scale) * y_scale)
+
+        cr.set_source_rgb(*color)
+        cr.set_line_width(1.5)
+        cr.stroke_preserve()
+        # Close the same path along the bottom edge for the fill
+        cr.line_to(width, bottom)
+        cr.line_to(x, bottom)
+        cr.close_path()
+        cr.set_source_rgba(*color, 0.25)
+        cr.fill()
+
+    def _draw_legend(self, cr, width):
+        cr.set_font_size(11)
+        cr.set_source_rgba(1, 1, 1, 0.7)
+        cr.move_to(2, 13)
+        cr.show_text(f"max {self.format_rate(self.scale)}")
+
+        x = width - 150
+        for label, color in (("Download", RX_COLOR), ("Upload", TX_COLOR)):
+            cr.set_source_rgb(*color)
+            cr.rectangle(x, 5, 10, 10)
+            cr.fill()
+            cr.set_source_rgba(1, 1, 1, 0.7)
+            cr.move_to(x + 14, 14)
+            cr.show_text(label)
+            x += 75
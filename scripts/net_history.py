@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Persistent traffic history for net-stats.py.
+
+Per-interface rx/tx byte counts are kept in a small SQLite database as three
+round-robin tables: 1 s buckets for an hour, 1 min buckets for a day and 1 h
+buckets for a month. Each table has a fixed number of slots (timestamp // step
+modulo capacity), so the file never grows, and every sample is added to the
+current bucket of all three tables, which is the downsampling. Only one
+process records at a time (flock on the database's lock file); the others
+just read.
+
+Usage: net_history.py --collect    record in the background without GTK
+"""
+
+import fcntl
+import os
+import signal
+import sqlite3
+import sys
+import time
+
+from net_sampler import NetSampler
+
+HISTORY_DIR = os.path.expanduser("~/.cache/netman")
+HISTORY_DB = os.path.join(HISTORY_DIR, "history.db")
+LOCK_FILE = HISTORY_DB + ".lock"
+
+# name -> (bucket length in seconds, number of buckets kept)
+RESOLUTIONS = {
+    "1s": (1, 3600),
+    "1m": (60, 24 * 60),
+    "1h": (3600, 31 * 24)
+}
+COMMIT_INTERVAL = 10  # seconds between commits while recording
+RETRY_LOCK_INTERVAL = 60  # seconds between attempts to become the recorder
+SKIP_INTERFACES = ("lo",)
+
+
+class HistoryStore:
+    """Round-robin rx/tx history; record() only writes while holding the lock"""
+
+    def __init__(self, path=HISTORY_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # net-stats.py opens the store on the UI thread but only its worker uses it
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for name in RESOLUTIONS:
+            self.db.execute(
+                f"CREATE TABLE IF NOT EXISTS samples_{name} ("
+                "iface TEXT NOT NULL, slot INTEGER NOT NULL, ts INTEGER NOT NULL, "
+                "rx INTEGER NOT NULL, tx INTEGER NOT NULL, PRIMARY KEY (iface, slot)"
+                ") WITHOUT ROWID"
+            )
+        self.db.commit()
+
+        self.lock = None
+        self.lock_attempt = 0
+        self.last = None  # counters from the previous record() call
+        self.last_commit = time.monotonic()
+
+    @property
+    def writable(self):
+        return self.lock is not None
+
+    def acquire(self):
+        """Try to become the recorder; returns whether this store may write"""
+        if self.lock is not None:
+            return True
+        self.lock_attempt = time.monotonic()
+        lock = open(LOCK_FILE, "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        self.lock = lock
+        return True
+
+    def reset(self):
+        """Forget the previous counters, e.g. after sampling was paused"""
+        self.last = None
+
+    def record(self, counters, now=None):
+        """Add the byte deltas since the previous call to the current buckets"""
+        if self.lock is None:
+            if time.monotonic() - self.lock_attempt < RETRY_LOCK_INTERVAL or not self.acquire():
+                return
+
+        now = int(time.time() if now is None else now)
+        last, self.last = self.last, counters
+        if last is None:
+            return
+
+        rows = []
+        for iface, c in counters.items():
+            prev = last.get(iface)
+            if prev is None or iface in SKIP_INTERFACES:
+                continue
+            # Counters restart from zero when an interface is recreated
+            rx = c.bytes_recv - prev.bytes_recv if c.bytes_recv >= prev.bytes_recv else c.bytes_recv
+            tx = c.bytes_sent - prev.bytes_sent if c.bytes_sent >= prev.bytes_sent else c.bytes_sent
+            rows.append((iface, rx, tx))
+        if not rows:
+            return
+
+        for name, (step, capacity) in RESOLUTIONS.items():
+            bucket = now - now % step
+            slot = (now // step) % capacity
+            # A slot still holding an older bucket is overwritten, otherwise summed
+            self.db.executemany(
+                f"INSERT INTO samples_{name} (iface, slot, ts, rx, tx) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (iface, slot) DO UPDATE SET "
+                "rx = CASE WHEN ts = excluded.ts THEN rx + excluded.rx ELSE excluded.rx END, "
+                "tx = CASE WHEN ts = excluded.ts THEN tx + excluded.tx ELSE excluded.tx END, "
+                "ts = excluded.ts",
+                [(iface, slot, bucket, rx, tx) for iface, rx, tx in rows]
+            )
+
+        if time.monotonic() - self.last_commit >= COMMIT_INTERVAL:
+            self.commit()
+
+    def commit(self):
+        self.db.commit()
+        self.last_commit = time.monotonic()
+
+    def rates(self, iface, resolution, now=None):
+        """Return (rx, tx) lists of bytes/s, oldest first, one entry per bucket
+
+        Buckets with no data (nothing recording at the time) are 0.
+        """
+        step, capacity = RESOLUTIONS[resolution]
+        now = int(time.time() if now is None else now)
+        newest = now - now % step
+        oldest = newest - (capacity - 1) * step
+
+        rx = [0.0] * capacity
+        tx = [0.0] * capacity
+        cursor = self.db.execute(
+            f"SELECT ts, rx, tx FROM samples_{resolution} WHERE iface = ? AND ts >= ?",
+            (iface, oldest)
+        )
+        for ts, rx_bytes, tx_bytes in cursor:
+            index = (ts - oldest) // step
+            if 0 <= index < capacity:
+                rx[index] = rx_bytes / step
+                tx[index] = tx_bytes / step
+        return rx, tx
+
+    def close(self):
+        if self.writable:
+            self.commit()
+        self.db.close()
+        if self.lock is not None:
+            self.lock.close()
+            self.lock = None
+
+
+def collect():
+    """Record every interface once a second until interrupted"""
+    sampler = NetSampler()
+    store = HistoryStore()
+    if not store.acquire():
+        print("Another process is already recording", file=sys.stderr)
+        return 1
+    # Commit the last buckets when the session ends
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        next_tick = time.monotonic()
+        while True:
+            store.record(sampler.read_all())
+            next_tick += 1
+            time.sleep(max(0, next_tick - time.monotonic()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+        sampler.close()
+    return 0
+
+
+if __name__ == "__main__":
+    if "--collect" in sys.argv:
+        sys.exit(collect())
+    else:
+        print(__doc__.strip().split("\n\n")[-1])
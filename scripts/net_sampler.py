@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Interface counter sampling straight from /proc/net/dev.
+
+The file is opened once and re-read with os.pread, and the primary interface
+is taken from the default route. It is only re-resolved when an rtnetlink
+link/route notification arrives or the interface vanishes, so the choice
+can't flip between NICs mid-session the way a "most traffic" guess does.
+"""
+
+import collections
+import fcntl
+import os
+import socket
+import struct
+import time
+
+PROC_NET_DEV = "/proc/net/dev"
+PROC_NET_ROUTE = "/proc/net/route"
+PROC_NET_IPV6_ROUTE = "/proc/net/ipv6_route"
+SYS_CLASS_NET = "/sys/class/net"
+
+SIOCGIFADDR = 0x8915
+
+# rtnetlink multicast groups: RTMGRP_LINK, RTMGRP_IPV4_ROUTE, RTMGRP_IPV6_ROUTE
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_ROUTE = 0x400
+
+# Field order of a /proc/net/dev line after the "iface:" prefix
+DEV_FIELDS = (
+    'bytes_recv', 'packets_recv', 'errin', 'dropin', 'fifo_in', 'frame_in', 'compressed_in', 'multicast_in',
+    'bytes_sent', 'packets_sent', 'errout', 'dropout', 'fifo_out', 'colls_out', 'carrier_out', 'compressed_out'
+)
+Counters = collections.namedtuple('Counters', DEV_FIELDS)
+ZERO_RATES = Counters._make([0.0] * len(DEV_FIELDS))
+
+
+def parse_net_dev(data):
+    """Parse /proc/net/dev bytes into {iface: Counters}"""
+    counters = {}
+    # The first two lines are headers
+    for line in data.split(b'\n')[2:]:
+        name, sep, values = line.partition(b':')
+        if sep:
+            counters[name.strip().decode()] = Counters._make(map(int, values.split()))
+    return counters
+
+
+def default_route_interface():
+    """Interface of the lowest-metric default route (IPv4, then IPv6)"""
+    best = None
+    try:
+        with open(PROC_NET_ROUTE) as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                # Destination and Mask of 0 make a default route
+                if len(fields) >= 8 and fields[1] == '00000000' and fields[7] == '00000000':
+                    metric = int(fields[6])
+                    if best is None or metric < best[0]:
+                        best = (metric, fields[0])
+    except OSError:
+        pass
+    if best:
+        return best[1]
+
+    try:
+        with open(PROC_NET_IPV6_ROUTE) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 10 and fields[1] == '00' and fields[9] != 'lo' and fields[0] == '0' * 32:
+                    metric = int(fields[5], 16)
+                    if best is None or metric < best[0]:
+                        best = (metric, fields[9])
+    except OSError:
+        pass
+    return best[1] if best else None
+
+
+def is_virtual(iface):
+    """Whether an interface has no physical device (lo, bridges, veth, tun, ...)"""
+    return os.path.realpath(os.path.join(SYS_CLASS_NET, iface)).startswith("/sys/devices/virtual/")
+
+
+def interface_address(iface):
+    """IPv4 address of an interface, or None"""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            ifreq = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, struct.pack('256s', iface.encode()[:15]))
+    except OSError:
+        return None
+    return socket.inet_ntoa(ifreq[20:24])
+
+
+class NetSampler:
+    """Reads interface counters and tracks the primary interface"""
+
+    def __init__(self):
+        self.fd = os.open(PROC_NET_DEV, os.O_RDONLY)
+        self.buffer_size = 16384
+        self.primary = None
+        self.route_events = self._open_route_events()
+        self.dirty = True  # re-resolve the primary interface on next read
+
+    def _open_route_events(self):
+        """Non-blocking rtnetlink socket that becomes readable on link/route changes"""
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_ROUTE))
+            sock.setblocking(False)
+            return sock
+        except (OSError, AttributeError):
+            return None
+
+    def _links_changed(self):
+        if self.route_events is None:
+            return False
+        changed = False
+        try:
+            while self.route_events.recv(65536):
+                changed = True
+        except BlockingIOError:
+            pass
+        except OSError:
+            changed = True
+        return changed
+
+    def read_raw(self):
+        data = os.pread(self.fd, self.buffer_size, 0)
+        # Grow the buffer until a read covers the whole file
+        while len(data) == self.buffer_size:
+            self.buffer_size *= 2
+            data = os.pread(self.fd, self.buffer_size, 0)
+        return data
+
+    def read_all(self):
+        """Counters for every interface"""
+        return parse_net_dev(self.read_raw())
+
+    def _pick_primary(self, counters):
+        iface = default_route_interface()
+        if iface in counters:
+            return iface
+        # No default route: fall back to the busiest non-loopback interface
+        busiest = [(c.bytes_recv + c.bytes_sent, name) for name, c in counters.items() if name != 'lo']
+        return max(busiest)[1] if busiest else None
+
+    def sample_all(self):
+        """Return (primary interface, {iface: Counters}) from a single read"""
+        counters = self.read_all()
+        if self._links_changed() or self.dirty or self.primary not in counters:
+            self.primary = self._pick_primary(counters)
+            self.dirty = False
+        return self.primary, counters
+
+    def sample(self):
+        """Return (primary interface, Counters) or (None, None)"""
+        data = self.read_raw()
+        if self._links_changed():
+            self.dirty = True
+
+        if not self.dirty and self.primary:
+            # Fast path: only parse the primary interface's line
+            key = f"{self.primary}:".encode()
+            start = data.find(key)
+            if start > 0 and data[start - 1:start] in (b' ', b'\n'):
+                end = data.find(b'\n', start)
+                values = data[start + len(key):end if end >= 0 else None].split()
+                return self.primary, Counters._make(map(int, values))
+            self.dirty = True
+
+        counters = parse_net_dev(data)
+        self.primary = self._pick_primary(counters)
+        self.dirty = False
+        if self.primary is None:
+            return None, None
+        return self.primary, counters[self.primary]
+
+    def close(self):
+        os.close(self.fd)
+        if self.route_events is not None:
+            self.route_events.close()
+
+
+class CounterRates:
+    """Per-second rates of every counter of every interface between reads"""
+
+    def __init__(self):
+        self.previous = {}
+        self.previous_time = None
+
+    def update(self, counters, now=None):
+        """Return {iface: Counters of per-second rates} since the previous call
+
+        All fields of all interfaces are differenced in one pass. Interfaces
+        that are new, or whose counters went backwards (recreated), report 0.
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = now - self.previous_time if self.previous_time else None
+        rates = {}
+        if elapsed:
+            for iface, current in counters.items():
+                prev = self.previous.get(iface)
+                if prev is None:
+                    rates[iface] = ZERO_RATES
+                    continue
+                rates[iface] = Counters._make([
+                    (value - old) / elapsed if value >= old else 0.0
+                    for value, old in zip(current, prev)
+                ])
+        self.previous = counters
+        self.previous_time = now
+        return rates
+
+    def reset(self):
+        self.previous = {}
+        self.previous_time = None
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Prayer timetable cache shared by salaat.py and lock-salaat.py.
+
+Timetables are keyed by (location, method, school, timezone) and then by
+date, and a whole year is filled in one go, either from the local engine in
+prayer_times.py or from Aladhan's calendar endpoint. Lookups for a cached day
+never touch the network. The file is replaced atomically so Waybar and
+hyprlock can read it while the other one is writing.
+"""
+
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from atomic_json import write_json
+from prayer_times import TIMING_NAMES, compute_times
+
+CACHE_FILE = Path.home() / ".cache" / "prayer_times.json"
+CACHE_VERSION = 1
+CACHE_TTL = 30 * 24 * 3600  # refetch Aladhan tables after a month
+RETRY_TTL = 3600  # retry Aladhan hourly after falling back to local tables
+KEEP_DAYS = 1  # keep yesterday around for late-night lookups
+
+
+def table_key(latitude, longitude, method, school, timezone):
+    """Cache key for one location/method/school combination"""
+    return f"{latitude:.4f},{longitude:.4f}|{method}|{school}|{timezone}"
+
+
+def _load():
+    try:
+        with open(CACHE_FILE) as f:
+            data = json.load(f)
+        if data.get('version') == CACHE_VERSION:
+            return data
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Cache Error: {e}", file=sys.stderr)
+    return {'version': CACHE_VERSION, 'tables': {}}
+
+
+def _save(data):
+    """Write the cache via a temp file and rename so readers never see a partial file"""
+    try:
+        write_json(CACHE_FILE, data, separators=(',', ':'))
+    except Exception as e:
+        print(f"Cache Error: {e}", file=sys.stderr)
+
+
+def _is_fresh(table, source):
+    age = time.time() - table.get('fetched', 0)
+    if table.get('source') == 'aladhan':
+        return age <= CACHE_TTL
+    # A local table stands in for Aladhan only until the next retry
+    return source != 'aladhan' or age <= RETRY_TTL
+
+
+def _evict(data, today):
+    """Drop dates that can no longer be asked for and tables past their TTL"""
+    cutoff = (today - timedelta(days=KEEP_DAYS)).isoformat()
+    now = time.time()
+    for key in list(data['tables']):
+        table = data['tables'][key]
+        if table.get('source') == 'aladhan' and now - table.get('fetched', 0) > CACHE_TTL:
+            del data['tables'][key]
+            continue
+        days = table['days']
+        for day in [d for d in days if d < cutoff]:
+            del days[day]
+        if not days:
+            del data['tables'][key]
+
+
+def _calculate_year(year, latitude, longitude, timezone, method, school):
+    tz = ZoneInfo(timezone)
+    days = {}
+    day = date(year, 1, 1)
+    while day.year == year:
+        # Offset at midday so DST transitions don't skew the whole timetable
+        offset = datetime(day.year, day.month, day.day, 12, tzinfo=tz).utcoffset().total_seconds() / 3600
+        try:
+            days[day.isoformat()] = compute_times(day, latitude, longitude, offset, method, school)
+        except Exception as e:
+            # One bad date must not cost the rest of the year; mark it like
+            # the engine marks timings it can't reach
+            print(f"Calculation Error on {day}: {e}", file=sys.stderr)
+            days[day.isoformat()] = {name: "-----" for name in TIMING_NAMES}
+        day += timedelta(days=1)
+    return days
+
+
+def _fetch_year(year, latitude, longitude, timezone, method, school):
+    """Fetch a whole year from Aladhan's calendar endpoint in one request"""
+    import requests
+
+    url = f"http://api.aladhan.com/v1/calendar/{year}"
+    params = {
+        'latitude': latitude,
+        'longitude': longitude,
+        'method': method,
+        'school': school,
+        'timezonestring': timezone
+    }
+    response = requests.get(url, params=params, timeout=10)
+    response.raise_for_status()
+    data = response.json()
+    if data.get('code') != 200:
+        raise ValueError(f"Aladhan returned {data.get('code')}")
+
+    days = {}
+    for month in data['data'].values():
+        for entry in month:
+            greg = entry['date']['gregorian']
+            day = datetime.strptime(greg['date'], "%d-%m-%Y").date()
+            # Calendar timings carry a zone suffix, e.g. "05:01 (SAST)"
+            days[day.isoformat()] = {name: value.split()[0] for name, value in entry['timings'].items()}
+    return days
+
+
+def prefetch(year, latitude, longitude, timezone, method=3, school=0, source="local", data=None):
+    """Fill the cache with a whole year's timetable and return the cache data"""
+    save = data is None
+    if data is None:
+        data = _load()
+
+    days = None
+    used = source
+    if source == "aladhan":
+        try:
+            days = _fetch_year(year, latitude, longitude, timezone, method, school)
+        except Exception as e:
+            print(f"API Error: {e}", file=sys.stderr)
+    if days is None:
+        days = _calculate_year(year, latitude, longitude, timezone, method, school)
+        used = "local"
+
+    key = table_key(latitude, longitude, method, school, timezone)
+    table = data['tables'].setdefault(key, {'days': {}})
+    table['days'].update(days)
+    table['source'] = used
+    table['fetched'] = time.time()
+
+    _evict(data, date.today())
+    if save:
+        _save(data)
+    return data
+
+
+def get_timings(day, latitude, longitude, timezone, method=3, school=0, source="local"):
+    """Return the timings for a date, filling the cache for that year on a miss"""
+    data = _load()
+    key = table_key(latitude, longitude, method, school, timezone)
+    table = data['tables'].get(key)
+    if table and day.isoformat() in table['days'] and _is_fresh(table, source):
+        return table['days'][day.isoformat()]
+
+    data = prefetch(day.year, latitude, longitude, timezone, method, school, source, data)
+    _save(data)
+    return data['tables'].get(key, {}).get('days', {}).get(day.isoformat())
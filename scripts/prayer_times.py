@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Offline prayer time calculation.
+
+Computes the daily timetable from the sun's position using the same
+astronomical model (PrayTimes) that api.aladhan.com is built on, so the
+results match the API for the same method and school without any network
+access.
+"""
+
+import json
+import math
+import os
+from datetime import date, timedelta
+import sys
+
+# Aladhan method id -> (fajr angle, isha angle or minutes after maghrib,
+# maghrib angle or minutes after sunset).  Angles are floats, fixed offsets
+# are strings ending in "min", exactly as Aladhan documents them.
+METHODS = {
+    0: (16.0, 14.0, 4.0),           # Shia Ithna-Ashari, Leva Institute, Qum
+    1: (18.0, 18.0, "0 min"),       # University of Islamic Sciences, Karachi
+    2: (15.0, 15.0, "0 min"),       # Islamic Society of North America
+    3: (18.0, 17.0, "0 min"),       # Muslim World League
+    4: (18.5, "90 min", "0 min"),   # Umm Al-Qura University, Makkah
+    5: (19.5, 17.5, "0 min"),       # Egyptian General Authority of Survey
+    7: (17.7, 14.0, 4.5),           # Institute of Geophysics, Tehran
+    8: (19.5, "90 min", "0 min"),   # Gulf Region
+    9: (18.0, 17.5, "0 min"),       # Kuwait
+    10: (18.0, "90 min", "0 min"),  # Qatar
+    11: (20.0, 18.0, "0 min"),      # Majlis Ugama Islam Singapura
+    12: (12.0, 12.0, "0 min"),      # Union Organization Islamic de France
+    13: (18.0, 17.0, "0 min"),      # Diyanet Isleri Baskanligi, Turkey
+    14: (16.0, 15.0, "0 min"),      # Spiritual Administration of Muslims of Russia
+    15: (18.0, 18.0, "0 min"),      # Moonsighting Committee Worldwide
+    16: (18.2, 18.2, "0 min"),      # Dubai
+    17: (20.0, 18.0, "0 min"),      # Jabatan Kemajuan Islam Malaysia (JAKIM)
+    18: (18.0, 18.0, "0 min"),      # Tunisia
+    19: (18.0, 17.0, "0 min"),      # Algeria
+    20: (20.0, 18.0, "0 min"),      # Kementerian Agama Republik Indonesia
+    21: (19.0, 17.0, "0 min"),      # Morocco
+    22: (18.0, "77 min", "3 min"),  # Comunidade Islamica de Lisboa
+    23: (18.0, 18.0, "5 min"),      # Ministry of Awqaf, Jordan
+}
+
+# Order in which Aladhan returns its timings
+TIMING_NAMES = ['Fajr', 'Sunrise', 'Dhuhr', 'Asr', 'Sunset', 'Maghrib', 'Isha', 'Imsak', 'Midnight']
+
+IMSAK_MINUTES = 10
+
+
+def _sin(d): return math.sin(math.radians(d))
+def _cos(d): return math.cos(math.radians(d))
+def _tan(d): return math.tan(math.radians(d))
+def _arcsin(x): return math.degrees(math.asin(x))
+def _arccos(x): return math.degrees(math.acos(x))
+def _arctan2(y, x): return math.degrees(math.atan2(y, x))
+def _arccot(x): return math.degrees(math.atan(1.0 / x))
+def _fix_angle(a): return a - 360.0 * math.floor(a / 360.0)
+def _fix_hour(h): return h - 24.0 * math.floor(h / 24.0)
+
+
+def _is_minutes(value):
+    return isinstance(value, str)
+
+
+def _minutes(value):
+    return float(value.split()[0])
+
+
+def _julian(day):
+    """Julian date at 00:00 UTC for a calendar date"""
+    year, month = day.year, day.month
+    if month <= 2:
+        year -= 1
+        month += 12
+    a = year // 100
+    b = 2 - a + a // 4
+    return math.floor(365.25 * (year + 4716)) + math.floor(30.6001 * (month + 1)) + day.day + b - 1524.5
+
+
+def _sun_position(jd):
+    """Return (declination, equation of time) for a julian date"""
+    d = jd - 2451545.0
+    g = _fix_angle(357.529 + 0.98560028 * d)
+    q = _fix_angle(280.459 + 0.98564736 * d)
+    lon = _fix_angle(q + 1.915 * _sin(g) + 0.020 * _sin(2 * g))
+    e = 23.439 - 0.00000036 * d
+    ra = _arctan2(_cos(e) * _sin(lon), _cos(lon)) / 15.0
+    eqt = q / 15.0 - _fix_hour(ra)
+    decl = _arcsin(_sin(e) * _sin(lon))
+    return decl, eqt
+
+
+class _Solver:
+    """Solves sun-angle events for one date and location"""
+
+    def __init__(self, day, latitude, longitude):
+        self.lat = latitude
+        self.jd = _julian(day) - longitude / (15.0 * 24.0)
+
+    def mid_day(self, t):
+        _, eqt = _sun_position(self.jd + t)
+        return _fix_hour(12 - eqt)
+
+    def sun_angle_time(self, angle, t, ccw=False):
+        decl, _ = _sun_position(self.jd + t)
+        noon = self.mid_day(t)
+        cos_h = (-_sin(angle) - _sin(decl) * _sin(self.lat)) / (_cos(decl) * _cos(self.lat))
+        if cos_h < -1 or cos_h > 1:
+            return math.nan  # the sun never reaches this angle today
+        h = _arccos(cos_h) / 15.0
+        return noon - h if ccw else noon + h
+
+    def asr_time(self, factor, t):
+        decl, _ = _sun_position(self.jd + t)
+        angle = -_arccot(factor + _tan(abs(self.lat - decl)))
+        return self.sun_angle_time(angle, t)
+
+
+def _night_portion(angle, night):
+    # Aladhan's default high latitude rule is ANGLE_BASED
+    return angle / 60.0 * night
+
+
+def _adjust_high_lat(t, base, angle, night, ccw=False):
+    portion = _night_portion(angle, night)
+    if math.isnan(t) or (_fix_hour(base - t) if ccw else _fix_hour(t - base)) > portion:
+        t = base - portion if ccw else base + portion
+    return t
+
+
+def _format(t):
+    if math.isnan(t):
+        return "-----"
+    t = _fix_hour(t + 0.5 / 60.0)  # round to the nearest minute
+    hours = int(t)
+    minutes = int((t - hours) * 60.0)
+    return f"{hours:02d}:{minutes:02d}"
+
+
+def compute_times(day, latitude, longitude, utc_offset, method=3, school=0, elevation=0):
+    """Compute a day's timings as Aladhan-style {"Fajr": "HH:MM", ...}
+
+    utc_offset is the local offset from UTC in hours for that date.
+    school 1 is Hanafi (shadow factor 2), anything else Shafi'i.
+    """
+    fajr_angle, isha_param, maghrib_param = METHODS.get(method, METHODS[3])
+    asr_factor = 2 if school == 1 else 1
+    rise_set_angle = 0.833 + 0.0347 * math.sqrt(elevation)
+
+    solver = _Solver(day, latitude, longitude)
+
+    # One refinement pass from the usual first guesses (as day fractions)
+    fajr = solver.sun_angle_time(fajr_angle, 5 / 24.0, ccw=True)
+    sunrise = solver.sun_angle_time(rise_set_angle, 6 / 24.0, ccw=True)
+    dhuhr = solver.mid_day(12 / 24.0)
+    asr = solver.asr_time(asr_factor, 13 / 24.0)
+    sunset = solver.sun_angle_time(rise_set_angle, 18 / 24.0)
+    maghrib = math.nan if _is_minutes(maghrib_param) else solver.sun_angle_time(maghrib_param, 18 / 24.0)
+    isha = math.nan if _is_minutes(isha_param) else solver.sun_angle_time(isha_param, 18 / 24.0)
+
+    shift = utc_offset - longitude / 15.0
+    fajr, sunrise, dhuhr, asr, sunset, maghrib, isha = (
+        t + shift for t in (fajr, sunrise, dhuhr, asr, sunset, maghrib, isha)
+    )
+
+    # Under the midnight sun or polar night there is no sunrise or sunset,
+    # so no night to base the adjustments on; those timings stay "-----"
+    polar = math.isnan(sunrise) or math.isnan(sunset)
+    night = math.nan if polar else _fix_hour(sunrise - sunset)
+    if not polar:
+        fajr = _adjust_high_lat(fajr, sunrise, fajr_angle, night, ccw=True)
+        if not _is_minutes(isha_param):
+            isha = _adjust_high_lat(isha, sunset, isha_param, night)
+        if not _is_minutes(maghrib_param):
+            maghrib = _adjust_high_lat(maghrib, sunset, maghrib_param, night)
+
+    if _is_minutes(maghrib_param):
+        maghrib = sunset + _minutes(maghrib_param) / 60.0
+    if _is_minutes(isha_param):
+        isha = maghrib + _minutes(isha_param) / 60.0
+
+    imsak = fajr - IMSAK_MINUTES / 60.0
+    midnight = sunset + night / 2.0
+
+    values = (fajr, sunrise, dhuhr, asr, sunset, maghrib, isha, imsak, midnight)
+    return {name: _format(t) for name, t in zip(TIMING_NAMES, values)}
+
+
+COMPARED_NAMES = ['Fajr', 'Sunrise', 'Dhuhr', 'Asr', 'Maghrib', 'Isha']
+RECORDED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prayer_times_recorded.json")
+# Aladhan rounds a little differently, so a minute either way still matches
+TOLERANCE_MINUTES = 1
+
+
+def _utc_offset(day, timezone):
+    from zoneinfo import ZoneInfo
+    from datetime import datetime
+
+    noon = datetime(day.year, day.month, day.day, 12, tzinfo=ZoneInfo(timezone))
+    return noon.utcoffset().total_seconds() / 3600
+
+
+def _fetch_api(day, latitude, longitude, timezone, method, school):
+    """Timings from api.aladhan.com, trimmed to HH:MM"""
+    import requests
+
+    url = f"http://api.aladhan.com/v1/timings/{day.strftime('%d-%m-%Y')}"
+    params = {'latitude': latitude, 'longitude': longitude, 'method': method,
+              'school': school, 'timezonestring': timezone}
+    timings = requests.get(url, params=params, timeout=10).json()['data']['timings']
+    return {name: timings[name][:5] for name in COMPARED_NAMES}
+
+
+def _minutes_apart(a, b):
+    if "-" in a or "-" in b:
+        return 0 if a == b else 24 * 60
+    diff = abs(int(a[:2]) * 60 + int(a[3:]) - int(b[:2]) * 60 - int(b[3:]))
+    return min(diff, 24 * 60 - diff)
+
+
+def _compare_with_api(latitude, longitude, timezone, method, school, days):
+    """Print local results next to api.aladhan.com for the next few days"""
+    start = date.today()
+    mismatches = 0
+    for i in range(days):
+        day = start + timedelta(days=i)
+        local = compute_times(day, latitude, longitude, _utc_offset(day, timezone), method, school)
+        remote = _fetch_api(day, latitude, longitude, timezone, method, school)
+        for name in COMPARED_NAMES:
+            mark = "" if remote[name] == local[name] else "  <-- differs"
+            mismatches += bool(mark)
+            print(f"{day} {name:8} api {remote[name]}  local {local[name]}{mark}")
+    return mismatches
+
+
+def _load_recorded():
+    with open(RECORDED_FILE) as f:
+        return json.load(f)
+
+
+def _record(force=False):
+    """Fill in the API timings of every recorded case that has none yet"""
+    from atomic_json import write_json
+
+    data = _load_recorded()
+    for case in data["cases"]:
+        if case["timings"] is not None and not force:
+            continue
+        day = date.fromisoformat(case["date"])
+        case["timings"] = _fetch_api(day, case["latitude"], case["longitude"], case["timezone"],
+                                     case["method"], case["school"])
+        print(f"Recorded {case['name']} {case['date']}")
+    write_json(RECORDED_FILE, data, indent=2)
+    return 0
+
+
+def _check_recorded():
+    """Compare compute_times against the recorded Aladhan responses, offline"""
+    data = _load_recorded()
+    failures = 0
+    checked = 0
+    for case in data["cases"]:
+        day = date.fromisoformat(case["date"])
+        try:
+            local = compute_times(day, case["latitude"], case["longitude"],
+                                  _utc_offset(day, case["timezone"]), case["method"], case["school"])
+        except Exception as e:
+            print(f"FAIL {case['name']} {case['date']}: {e!r}")
+            failures += 1
+            continue
+        if case["timings"] is None or case.get("polar"):
+            continue  # not recorded yet, or polar: only checked for crashes
+        checked += 1
+        for name in COMPARED_NAMES:
+            if _minutes_apart(local[name], case["timings"][name]) > TOLERANCE_MINUTES:
+                print(f"FAIL {case['name']} {case['date']} method {case['method']} {name}: "
+                      f"api {case['timings'][name]} local {local[name]}")
+                failures += 1
+
+    pending = len(data["cases"]) - checked
+    print(f"{checked} recorded cases compared, {failures} failures"
+          + (f", {pending} without recorded timings (run --record)" if pending else ""))
+    return 1 if failures or not checked else 0
+
+
+USAGE = """Usage: prayer_times.py LAT LON TIMEZONE [METHOD] [SCHOOL] [DAYS]   compare with the live API
+       prayer_times.py --check            compare with the recorded responses (offline)
+       prayer_times.py --record [--force] record API responses for the cases in prayer_times_recorded.json"""
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        sys.exit(_check_recorded())
+    if "--record" in sys.argv:
+        sys.exit(_record(force="--force" in sys.argv))
+    if len(sys.argv) < 4:
+        print(USAGE, file=sys.stderr)
+        sys.exit(2)
+    lat, lon, zone = float(sys.argv[1]), float(sys.argv[2]), sys.argv[3]
+    method = int(sys.argv[4]) if len(sys.argv) > 4 else 3
+    school = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+    days = int(sys.argv[6]) if len(sys.argv) > 6 else 7
+    sys.exit(1 if _compare_with_api(lat, lon, zone, method, school, days) else 0)
@@ -1,49 +1,41 @@
 #!/usr/bin/env python3
 
-import requests
 import json
-from datetime import datetime
-from pathlib import Path
+from datetime import date, datetime, timedelta
 import sys
+import time
+
+from prayer_cache import get_timings
 
 # Configuration for Johannesburg
-CITY = "Johannesburg"
-COUNTRY = "South Africa"
+LATITUDE = -26.2041
+LONGITUDE = 28.0473
 METHOD = 3  # 3 = Shafi'i (MWL) calculation method
+MADHHAB = 0  # 0 = Shafi'i, 1 = Hanafi
 TIMEZONE = "Africa/Johannesburg"
-CACHE_FILE = Path.home() / ".cache" / "prayer_times.json"
+SOURCE = "aladhan"  # "aladhan" calendar API (local fallback) or "local" calculation only
 
-def fetch_prayer_times():
-    """Fetch prayer times from API with error handling"""
+def get_prayer_times():
+    """Get today's prayer times from the timetable cache"""
     try:
-        url = f"http://api.aladhan.com/v1/timingsByCity?city={CITY}&country={COUNTRY}&method={METHOD}&school=0"
-        response = requests.get(url, timeout=5)
-        data = response.json()
-        
-        if data.get('code') == 200:
-            # Cache the successful response
-            with open(CACHE_FILE, 'w') as f:
-                json.dump(data, f)
-            return data['data']['timings']
-        return None
+        return get_timings(date.today(), LATITUDE, LONGITUDE, TIMEZONE, METHOD, MADHHAB, SOURCE)
     except Exception as e:
-        print(f"API Error: {e}", file=sys.stderr)
+        print(f"Prayer Times Error: {e}", file=sys.stderr)
         return None
 
-def get_cached_times():
-    """Get cached prayer times if available"""
-    try:
-        if CACHE_FILE.exists():
-            with open(CACHE_FILE) as f:
-                data = json.load(f)
-                return data['data']['timings']
-    except Exception as e:
-        print(f"Cache Error: {e}", file=sys.stderr)
-    return None
+def format_countdown(now, prayer_time):
+    """Time left until an HH:MM prayer time, wrapping past midnight"""
+    hours, minutes = map(int, prayer_time.split(':'))
+    target = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    left = int((target - now).total_seconds() + 59) // 60  # round up to whole minutes
+    return f"{left // 60}h {left % 60:02d}m" if left >= 60 else f"{left}m"
 
-def format_output(prayer_times):
+def format_output(prayer_times, now=None):
     """Format the output for Waybar"""
-    now = datetime.now().strftime('%H:%M')
+    now_dt = now or datetime.now()
+    now = now_dt.strftime('%H:%M')
     prayers_order = ['Fajr', 'Sunrise', 'Dhuhr', 'Asr', 'Maghrib', 'Isha']
     prayers = [(name, prayer_times[name]) for name in prayers_order if name in prayer_times]
     
@@ -60,23 +52,57 @@ def format_output(prayer_times):
     
     return {
         'text': f" {current[0]}: {current[1]} | Next: {next_prayer[0]}: {next_prayer[1]}",
-        'tooltip': "\n".join([f"{p}: {t}" for p, t in prayer_times.items() if p in prayers_order]),
+        'tooltip': "\n".join([f"{next_prayer[0]} in {format_countdown(now_dt, next_prayer[1])}"] +
+                             [f"{p}: {t}" for p, t in prayer_times.items() if p in prayers_order]),
         'class': 'prayer-times'
     }
 
-def main():
-    # Try to fetch fresh times, fall back to cache if needed
-    prayer_times = fetch_prayer_times() or get_cached_times()
-    
+def build_output(prayer_times, now=None):
+    """Waybar JSON for the given timings, or the error state"""
     if not prayer_times:
-        print(json.dumps({
+        return {
             'text': "⛔ Prayer Times Error",
-            'tooltip': "Failed to fetch prayer times. Check internet connection.",
+            'tooltip': "Failed to calculate prayer times.",
             'class': 'error'
-        }))
+        }
+    return format_output(prayer_times, now)
+
+def watch():
+    """Stream a JSON line to Waybar whenever the output changes
+
+    Everything shown is minute-granular, so the loop sleeps until the next
+    minute boundary and only writes when the rendered output differs.
+    """
+    last_line = None
+    day = prayer_times = None
+    while True:
+        now = datetime.now()
+        if now.date() != day:
+            prayer_times = get_prayer_times()
+            # Only a successful lookup settles the day; a failure retries next minute
+            if prayer_times:
+                day = now.date()
+
+        line = json.dumps(build_output(prayer_times, now))
+        if line != last_line:
+            try:
+                print(line, flush=True)
+            except BrokenPipeError:
+                return  # Waybar went away
+            last_line = line
+
+        # Cap the sleep so a suspend/resume never leaves the bar stale for long
+        time.sleep(min(60.5 - now.second - now.microsecond / 1e6, 60))
+
+def main():
+    if "--watch" in sys.argv:
+        try:
+            watch()
+        except KeyboardInterrupt:
+            pass
         return
-    
-    print(json.dumps(format_output(prayer_times)))
+
+    print(json.dumps(build_output(get_prayer_times())))
 
 if __name__ == "__main__":
     main()
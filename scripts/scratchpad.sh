@@ -0,0 +1,8 @@
+#!/bin/bash
+# Present a scratchpad window (binds, netman or upman) from the resident host.
+# gapplication only talks D-Bus, so this is the fast path; if the host isn't
+# running yet, start it with the requested window instead.
+
+APP_ID="com.github.riezz0.Hyprcore"
+
+gapplication action "$APP_ID" present "'$1'" 2>/dev/null || exec python3 ~/.config/scripts/scratchpads.py "$1"
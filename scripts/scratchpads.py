@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Resident host for the binds, netman and upman scratchpad windows.
+
+One Gtk.Application owns the session bus name APP_ID and builds each window
+the first time it is asked for. Closing a window only hides it, so the next
+toggle of its special workspace is a D-Bus "present" call that maps the
+already-built window again instead of starting Python and GTK from scratch.
+Hidden windows stop their own timers (netman pauses sampling when unmapped).
+
+Usage: scratchpads.py [binds|netman|upman]   start the host, or forward to it
+       scratchpad.sh NAME                     present via gapplication (fast path)
+"""
+
+import importlib.util
+import os
+import sys
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gio, GLib, Gtk
+
+APP_ID = "com.github.riezz0.Hyprcore"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(name, filename):
+    """Import a script by path (net-stats.py isn't a valid module name)"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_binds():
+    binds = load_script("binds", "binds.py")
+    window = binds.PixelPerfectShortcuts()
+    return window, window
+
+
+def build_netman():
+    net_stats = load_script("net_stats", "net-stats.py")
+    app = net_stats.NetworkStatsApp(scratchpad=True)
+    return app, app.window
+
+
+def build_upman():
+    updates = load_script("updates", "updates.py")
+    window = updates.UpdateManager()
+    return window, window
+
+
+# name -> builder returning (owner object, toplevel window)
+WINDOWS = {
+    "binds": build_binds,
+    "netman": build_netman,
+    "upman": build_upman
+}
+
+
+class ScratchpadHost(Gtk.Application):
+    def __init__(self):
+        super().__init__(application_id=APP_ID, flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE)
+        self.instances = {}  # name -> (owner, window)
+
+        present = Gio.SimpleAction.new("present", GLib.VariantType.new("s"))
+        present.connect("activate", lambda action, name: self.present_window(name.get_string()))
+        self.add_action(present)
+
+    def do_startup(self):
+        Gtk.Application.do_startup(self)
+        # Stay resident while every window is hidden
+        self.hold()
+
+    def do_command_line(self, command_line):
+        for name in command_line.get_arguments()[1:]:
+            self.present_window(name)
+        return 0
+
+    def present_window(self, name):
+        if name not in WINDOWS:
+            print(f"Unknown window: {name}", file=sys.stderr)
+            return
+
+        instance = self.instances.get(name)
+        if instance is None:
+            owner, window = WINDOWS[name]()
+            self.add_window(window)
+            window.connect("delete-event", self.on_delete)
+            window.show_all()
+            self.instances[name] = (owner, window)
+        else:
+            window = instance[1]
+        window.present()
+
+    def on_delete(self, window, event):
+        # Hide instead of destroying so the window can be presented again
+        window.hide()
+        return True
+
+
+def main():
+    app = ScratchpadHost()
+    return app.run(sys.argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
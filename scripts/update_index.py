@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Shared update index for updates.sh (Waybar) and updates.py (upman).
+
+Parsed results of checkupdates, yay and flatpak are stored per backend in
+~/.cache/upman/update_index.json together with the time of the check and
+the pacman database mtime. A backend's entry stays fresh until it is older
+than MAX_AGE or pacman's databases change, so whichever entry point runs
+second reuses the other's network work.
+
+Usage: update_index.py --counts    print "PACMAN AUR FLATPAK" counts,
+                                   refreshing only stale backends
+"""
+
+import fcntl
+import glob
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from atomic_json import write_json
+
+INDEX_FILE = os.path.expanduser("~/.cache/upman/update_index.json")
+LOCK_FILE = INDEX_FILE + ".lock"
+INDEX_VERSION = 2
+MAX_AGE = 1800  # matches the Waybar module's interval
+PACMAN_DBS = ["/var/lib/pacman/sync/*.db", "/var/lib/pacman/local"]
+
+# Update check command and timeout in seconds for each backend
+CHECKS = {
+    "flatpak": (["flatpak", "remote-ls", "--updates", "--columns=application,version,origin"], 60),
+    "pacman": (["checkupdates"], 120),
+    "yay": (["yay", "-Qua"], 120)
+}
+BACKENDS = list(CHECKS)
+
+def parse_flatpak_updates(output):
+    updates = []
+    for line in output.strip().split('\n'):
+        if line:
+            parts = line.split('\t')
+            if len(parts) >= 3:
+                updates.append({
+                    "name": parts[0],
+                    "version": parts[1],
+                    "origin": parts[2],
+                    "repo": parts[2]
+                })
+    return updates
+
+def parse_pacman_updates(output):
+    updates = []
+    for line in output.strip().split('\n'):
+        if line:
+            # checkupdates format: "package-name current-version -> new-version"
+            parts = line.split()
+            if len(parts) >= 4:
+                updates.append({
+                    "name": parts[0],
+                    "old_version": parts[1],
+                    "new_version": parts[3]
+                })
+    return updates
+
+def parse_aur_updates(output):
+    updates = []
+    for line in output.strip().split('\n'):
+        # yay -Qua format, like checkupdates: "package-name current-version -> new-version"
+        parts = line.split()
+        if len(parts) >= 4 and parts[2] == "->":
+            name = parts[0].removeprefix('aur/')
+            updates.append({
+                "name": name,
+                "old_version": parts[1],
+                "new_version": parts[3],
+                "repo": "aur"
+            })
+    return updates
+
+CHECK_PARSERS = {
+    "flatpak": parse_flatpak_updates,
+    "pacman": parse_pacman_updates,
+    "yay": parse_aur_updates
+}
+
+def pacman_repos():
+    """Map package name -> sync repository using one pacman -Sl call"""
+    repos = {}
+    try:
+        result = subprocess.run(["pacman", "-Sl"], capture_output=True, text=True, timeout=30, check=False)
+    except (OSError, subprocess.TimeoutExpired):
+        return repos
+    for line in result.stdout.splitlines():
+        parts = line.split(None, 2)
+        if len(parts) >= 2:
+            repos.setdefault(parts[1], parts[0])
+    return repos
+
+def check_failed(backend, returncode, stderr):
+    """Whether a check failed, as opposed to finding nothing to update"""
+    if backend == "pacman":
+        # checkupdates exits 2 for "no updates" and 1 when it couldn't sync
+        return returncode == 1
+    if backend == "yay":
+        # yay -Qua also exits 1 when nothing is outdated, so go by its errors
+        return returncode != 0 and "error" in stderr.lower()
+    return returncode != 0
+
+def parse_check_output(backend, returncode, output, stderr=""):
+    """Parse a check's output, or None if the check itself failed"""
+    if check_failed(backend, returncode, stderr):
+        return None
+    updates = CHECK_PARSERS[backend](output)
+    if backend == "pacman" and updates:
+        repos = pacman_repos()
+        for update in updates:
+            update["repo"] = repos.get(update["name"], "unknown")
+    return updates
+
+def pacman_db_mtime():
+    """Newest mtime across pacman's sync and local databases"""
+    mtime = 0
+    for pattern in PACMAN_DBS:
+        for path in glob.glob(pattern):
+            try:
+                mtime = max(mtime, os.stat(path).st_mtime)
+            except OSError:
+                pass
+    return mtime
+
+def load():
+    """Return {backend: entry} from the index file"""
+    try:
+        with open(INDEX_FILE) as f:
+            data = json.load(f)
+        if data.get("version") == INDEX_VERSION:
+            return data["backends"]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Index Error: {e}", file=sys.stderr)
+    return {}
+
+def is_fresh(backend, entry, db_mtime=None):
+    if not entry or time.time() - entry.get("checked", 0) > MAX_AGE:
+        return False
+    if backend in ("pacman", "yay"):
+        if db_mtime is None:
+            db_mtime = pacman_db_mtime()
+        return entry.get("db_mtime") == db_mtime
+    return True
+
+def stale_backends(index=None):
+    index = load() if index is None else index
+    db_mtime = pacman_db_mtime()
+    return [b for b in BACKENDS if not is_fresh(b, index.get(b), db_mtime)]
+
+def store(backend, updates):
+    """Record one backend's result; merges with concurrent writers"""
+    try:
+        os.makedirs(os.path.dirname(INDEX_FILE), exist_ok=True)
+        with open(LOCK_FILE, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            index = load()
+            index[backend] = {
+                "checked": time.time(),
+                "db_mtime": pacman_db_mtime(),
+                "updates": updates
+            }
+            write_json(INDEX_FILE, {"version": INDEX_VERSION, "backends": index})
+    except Exception as e:
+        print(f"Index Error: {e}", file=sys.stderr)
+
+def check(backend):
+    """Run one backend's check, store it and return the updates (None on failure)"""
+    cmd, timeout = CHECKS[backend]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, check=False)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Error checking {backend} updates: {e}", file=sys.stderr)
+        return None
+    updates = parse_check_output(backend, result.returncode, result.stdout, result.stderr)
+    if updates is None:
+        print(f"{backend} update check failed: {result.stderr.strip()}", file=sys.stderr)
+    else:
+        store(backend, updates)
+    return updates
+
+def refresh(backends):
+    """Check the given backends in parallel"""
+    threads = [threading.Thread(target=check, args=(b,)) for b in backends]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def get_updates():
+    """Return {backend: updates}, refreshing only what is stale"""
+    stale = stale_backends()
+    if stale:
+        refresh(stale)
+    index = load()
+    return {b: index.get(b, {}).get("updates", []) for b in BACKENDS}
+
+if __name__ == "__main__":
+    if "--counts" in sys.argv:
+        updates = get_updates()
+        print(len(updates["pacman"]), len(updates["yay"]), len(updates["flatpak"]))
+    else:
+        print(__doc__.strip().split("\n\n")[-1])
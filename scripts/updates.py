@@ -7,10 +7,174 @@ gi.require_version('Polkit', '1.0')
 from gi.repository import Gtk, Gdk, GLib, Pango, Polkit
 import subprocess
 import threading
+import codecs
+import collections
+import logging
+from logging.handlers import RotatingFileHandler
 import os
+import re
+import shutil
 import sys
+import time
+
+import update_index
+
+# Pending log lines are drawn at most once per frame, the log view keeps only
+# the newest LOG_MAX_LINES, and the full log goes to a rotating file
+LOG_FRAME_MS = 100
+LOG_MAX_LINES = 2000
+LOG_FILE = os.path.expanduser("~/.cache/upman/updates.log")
+LOG_FILE_BYTES = 1024 * 1024
+LOG_FILE_BACKUPS = 3
+# Longest unterminated line kept while waiting for its newline
+MAX_PARTIAL_LINE = 4096
+LINE_SPLIT = re.compile(r"\r\n|\r|\n")
+# pacman/yay "( 3/15)" step counters and trailing "45%" progress figures
+STEP_RE = re.compile(r"\(\s*(\d+)/(\d+)\)")
+PERCENT_RE = re.compile(r"(\d{1,3})%")
+
+def open_log_file():
+    """Logger writing the full update log to a rotating file"""
+    logger = logging.getLogger("upman")
+    if not logger.handlers:
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+            handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_BACKUPS)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s", "%Y-%m-%d %H:%M:%S"))
+            logger.addHandler(handler)
+        except OSError as e:
+            print(f"Warning: Could not open log file: {e}")
+            logger.addHandler(logging.NullHandler())
+    return logger
+
+# Packages downloaded ahead of the install phase. checkupdates leaves a synced
+# copy of the sync databases behind, which lets the download run unprivileged.
+PKG_CACHE = os.path.expanduser("~/.cache/upman/pkg")
+SYSTEM_PKG_CACHE = "/var/cache/pacman/pkg"
+CHECKUPDATES_DB = os.environ.get(
+    "CHECKUPDATES_DB", os.path.join(os.environ.get("TMPDIR", "/tmp"), f"checkup-db-{os.getuid()}")
+)
+
+def update_job(key, label, cmd, requires=(), optional=False):
+    return {"key": key, "label": label, "cmd": cmd, "requires": list(requires), "optional": optional}
+
+def plan_updates(selected):
+    """Build the update plan as [(phase, jobs)]
+
+    Downloads for every backend run in parallel first; installs then run
+    one at a time in a safe order: repo packages, AUR builds (which may link
+    against them), then Flatpak deploys. A job only runs if the jobs in its
+    "requires" list succeeded. Failed downloads are not fatal, the install
+    step simply fetches whatever is missing.
+
+    Any pacman selection is a full -Syu: refreshing the databases and then
+    installing a subset is a partial upgrade, which Arch doesn't support.
+    """
+    downloads = []
+    installs = []
+    
+    pacman = selected.get("pacman", [])
+    if pacman:
+        if os.path.isdir(CHECKUPDATES_DB) and shutil.which("fakeroot"):
+            downloads.append(update_job(
+                "pacman-download", "Pacman download",
+                ["fakeroot", "--", "pacman", "-Swu", "--noconfirm", "--dbpath", CHECKUPDATES_DB,
+                 "--cachedir", PKG_CACHE, "--logfile", "/dev/null"],
+                optional=True))
+        installs.append(update_job(
+            "pacman-install", "Pacman install",
+            ["pkexec", "pacman", "-Syu", "--noconfirm", "--cachedir", SYSTEM_PKG_CACHE, "--cachedir", PKG_CACHE]))
+    
+    aur = selected.get("yay", [])
+    if aur:
+        installs.append(update_job(
+            "aur-install", "AUR build",
+            ["yay", "-S", "--noconfirm"] + aur,
+            requires=["pacman-install"] if pacman else []))
+    
+    flatpak = selected.get("flatpak", [])
+    if flatpak:
+        downloads.append(update_job(
+            "flatpak-download", "Flatpak download",
+            ["flatpak", "update", "--no-deploy", "-y"] + flatpak,
+            optional=True))
+        installs.append(update_job(
+            "flatpak-install", "Flatpak deploy",
+            ["flatpak", "update", "-y"] + flatpak))
+    
+    # Installs are listed as separate phases so they never overlap
+    return [("Download", downloads)] + [(job["label"], [job]) for job in installs]
+
+def clear_download_cache():
+    """Drop prefetched packages once pacman has installed them"""
+    try:
+        for entry in os.scandir(PKG_CACHE):
+            if entry.is_file():
+                os.unlink(entry.path)
+    except OSError:
+        pass
+
+# Columns of the per-tab package ListStore
+COL_NAME, COL_VERSION, COL_REPO = range(3)
+ALL_REPOS = "All repositories"
+
+class Selection:
+    """Set of selected package names with O(1) bulk operations
+
+    Stored as a base state (everything or nothing selected) plus the names
+    that differ from it, so select all, clear and invert never touch the
+    individual packages.
+    """
+    def __init__(self):
+        self.everything = False
+        self.flipped = set()
+        self.known = set()
+        self.total = 0
+    
+    def __contains__(self, name):
+        return (name in self.flipped) != self.everything
+    
+    def __len__(self):
+        return self.total - len(self.flipped) if self.everything else len(self.flipped)
+    
+    def set(self, name, selected):
+        if selected != self.everything:
+            self.flipped.add(name)
+        else:
+            self.flipped.discard(name)
+    
+    def select_all(self):
+        self.everything = True
+        self.flipped.clear()
+    
+    def clear(self):
+        self.everything = False
+        self.flipped.clear()
+    
+    def invert(self):
+        self.everything = not self.everything
+    
+    def retain(self, names):
+        """Forget packages that are no longer available
+
+        Packages that appear after "Select All" start unselected, so an
+        update never includes something the user hasn't seen.
+        """
+        names = set(names)
+        if self.everything:
+            self.flipped.update(names - self.known)
+        self.flipped.intersection_update(names)
+        self.known = names
+        self.total = len(names)
+    
+    def resolve(self, names):
+        return [name for name in names if name in self]
 
 class UpdateManager(Gtk.Window):
+    CHECK_NAMES = {"flatpak": "Flatpak", "pacman": "Pacman", "yay": "AUR"}
+
     def __init__(self):
         super().__init__(title="Update Manager")
         self.set_default_size(800, 600)
@@ -34,20 +198,49 @@ class UpdateManager(Gtk.Window):
         
         # Store for updates
         self.updates = {
-            "flatpak": {"available": [], "selected": [], "count": 0},
-            "pacman": {"available": [], "selected": [], "count": 0},
-            "yay": {"available": [], "selected": [], "count": 0}
+            "flatpak": {"available": [], "selected": Selection(), "count": 0},
+            "pacman": {"available": [], "selected": Selection(), "count": 0},
+            "yay": {"available": [], "selected": Selection(), "count": 0}
         }
         
         # UI elements storage
         self.ui_elements = {
-            "flatpak": {"listbox": None, "count_label": None},
-            "pacman": {"listbox": None, "count_label": None},
-            "yay": {"listbox": None, "count_label": None}
+            pkg_type: {"store": None, "filter": None, "treeview": None, "rows": {},
+                       "count_label": None, "search": None, "repo_combo": None, "repos": [],
+                       "filter_state": ("", None)}
+            for pkg_type in self.updates
         }
         
+        # In-flight update checks; bumping the generation cancels a round
+        self.check_lock = threading.Lock()
+        self.check_generation = 0
+        self.check_procs = {}
+        self.checks_pending = set()
+        
+        # Log lines and progress waiting for the next frame
+        self.log_lock = threading.Lock()
+        self.pending_log = collections.deque(maxlen=LOG_MAX_LINES)
+        self.pending_status = None
+        self.stream_progress = None
+        self.log_flush_scheduled = False
+        self.file_log = open_log_file()
+        
+        self.updating = False
+        self.shown_before = False
+        
         self.create_ui()
-        self.check_updates()
+        self.connect("destroy", lambda w: self.cancel_checks())
+        # scratchpads.py hides the window instead of destroying it; catch up
+        # on stale backends whenever it is shown again
+        self.connect("map", self.on_map)
+        
+        # Show what the bar (or a previous run) already found, then only
+        # re-check backends whose cached results are stale
+        index = update_index.load()
+        for pkg_type in update_index.BACKENDS:
+            if pkg_type in index:
+                self.update_ui_with_updates(pkg_type, index[pkg_type]["updates"])
+        self.check_updates(update_index.stale_backends(index))
     
     def create_ui(self):
         main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
@@ -110,7 +303,7 @@ class UpdateManager(Gtk.Window):
         self.update_selected_btn.set_sensitive(False)
         
         close_btn = Gtk.Button(label="Close")
-        close_btn.connect("clicked", lambda x: Gtk.main_quit())
+        close_btn.connect("clicked", lambda x: self.close())
         
         button_box.pack_start(self.update_all_btn, True, True, 0)
         button_box.pack_start(self.update_selected_btn, True, True, 0)
@@ -135,22 +328,80 @@ class UpdateManager(Gtk.Window):
         box.pack_start(count_label, False, False, 0)
         self.ui_elements[pkg_type]["count_label"] = count_label
         
+        if pkg_type == "pacman":
+            note = Gtk.Label(label="Arch doesn't support partial upgrades: selecting any package "
+                                   "upgrades all of them (pacman -Syu)")
+            note.set_halign(Gtk.Align.START)
+            note.set_line_wrap(True)
+            box.pack_start(note, False, False, 0)
+        
         # Scrollable list
         scrolled = Gtk.ScrolledWindow()
         scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         scrolled.set_min_content_height(300)
         
-        listbox = Gtk.ListBox()
-        listbox.set_selection_mode(Gtk.SelectionMode.NONE)
-        scrolled.add(listbox)
+        # Filters
+        filter_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        search = Gtk.SearchEntry()
+        search.set_placeholder_text("Filter by name")
+        search.connect("search-changed", self.on_filter_changed, pkg_type)
+        filter_box.pack_start(search, True, True, 0)
+        
+        repo_combo = Gtk.ComboBoxText()
+        repo_combo.append_text(ALL_REPOS)
+        repo_combo.set_active(0)
+        repo_combo.connect("changed", self.on_filter_changed, pkg_type)
+        filter_box.pack_start(repo_combo, False, False, 0)
+        box.pack_start(filter_box, False, False, 0)
+        self.ui_elements[pkg_type]["search"] = search
+        self.ui_elements[pkg_type]["repo_combo"] = repo_combo
+        
+        # Model columns: package name, version text, repository. Check state
+        # is read from the Selection while drawing, and fixed-height rows let
+        # the view measure and draw only what is visible.
+        store = Gtk.ListStore(str, str, str)
+        model_filter = store.filter_new()
+        model_filter.set_visible_func(self.filter_visible, pkg_type)
+        treeview = Gtk.TreeView(model=model_filter)
+        treeview.set_headers_visible(False)
+        treeview.get_selection().set_mode(Gtk.SelectionMode.NONE)
+        
+        toggle = Gtk.CellRendererToggle()
+        toggle.connect("toggled", self.on_update_toggled, pkg_type)
+        column = Gtk.TreeViewColumn("", toggle)
+        column.set_cell_data_func(toggle, self.render_selected, pkg_type)
+        column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        column.set_fixed_width(40)
+        treeview.append_column(column)
+        
+        name_renderer = Gtk.CellRendererText(weight=Pango.Weight.BOLD, ellipsize=Pango.EllipsizeMode.END)
+        column = Gtk.TreeViewColumn("Package", name_renderer, text=COL_NAME)
+        column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        column.set_expand(True)
+        treeview.append_column(column)
+        
+        version_renderer = Gtk.CellRendererText(xalign=1.0, ellipsize=Pango.EllipsizeMode.START)
+        column = Gtk.TreeViewColumn("Version", version_renderer, text=COL_VERSION)
+        column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        column.set_fixed_width(320)
+        treeview.append_column(column)
+        
+        treeview.set_fixed_height_mode(True)
+        scrolled.add(treeview)
         
         box.pack_start(scrolled, True, True, 0)
-        self.ui_elements[pkg_type]["listbox"] = listbox
-        
-        # Select all button for this tab
-        select_btn = Gtk.Button(label=f"Select All {pkg_type.capitalize()} Updates")
-        select_btn.connect("clicked", self.on_select_all_clicked, pkg_type)
-        box.pack_start(select_btn, False, False, 0)
+        self.ui_elements[pkg_type]["store"] = store
+        self.ui_elements[pkg_type]["filter"] = model_filter
+        self.ui_elements[pkg_type]["treeview"] = treeview
+        
+        # Bulk selection buttons for this tab
+        select_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        select_box.set_homogeneous(True)
+        for label, mode in (("Select All", "all"), ("Select None", "none"), ("Invert Selection", "invert")):
+            select_btn = Gtk.Button(label=label)
+            select_btn.connect("clicked", self.on_bulk_select_clicked, pkg_type, mode)
+            select_box.pack_start(select_btn, True, True, 0)
+        box.pack_start(select_box, False, False, 0)
         
         return box
     
@@ -182,153 +433,192 @@ class UpdateManager(Gtk.Window):
         return box
     
     def add_log(self, message, color_tag="info"):
-        GLib.idle_add(self._add_log_idle, message, color_tag)
+        """Queue a timestamped message; safe to call from any thread"""
+        self.file_log.info(message)
+        timestamp = time.strftime("%H:%M:%S")
+        self.queue_log([(f"[{timestamp}] ", "info"), (f"{message}\n", color_tag)], status=message)
     
-    def _add_log_idle(self, message, color_tag):
-        text_buffer = self.log_view.get_buffer()
-        end_iter = text_buffer.get_end_iter()
-        
-        timestamp = GLib.DateTime.new_now_local().format("%H:%M:%S")
-        text_buffer.insert_with_tags_by_name(end_iter, f"[{timestamp}] ", "info")
-        text_buffer.insert_with_tags_by_name(end_iter, f"{message}\n", color_tag)
-        
-        # Scroll to end
-        mark = text_buffer.get_insert()
-        text_buffer.place_cursor(text_buffer.get_end_iter())
-        self.log_view.scroll_mark_onscreen(mark)
-        
-        # Update status bar
-        self.status_bar.push(self.status_context, message)
+    def queue_log(self, segments, status=None):
+        """Queue (text, tag) segments for the next log frame"""
+        with self.log_lock:
+            self.pending_log.append(segments)
+            if status is not None:
+                self.pending_status = status
+        self.schedule_log_flush()
     
-    def check_updates(self):
-        self.add_log("Checking for updates...", "info")
-        self.progress_bar.set_fraction(0.33)
-        self.progress_bar.set_text("Checking Flatpak updates...")
-        
-        # Check Flatpak updates
-        threading.Thread(target=self.check_flatpak_updates, daemon=True).start()
+    def schedule_log_flush(self):
+        with self.log_lock:
+            if self.log_flush_scheduled:
+                return
+            self.log_flush_scheduled = True
+        GLib.timeout_add(LOG_FRAME_MS, self._flush_log)
     
-    def check_flatpak_updates(self):
-        try:
-            result = subprocess.run(
-                ["flatpak", "remote-ls", "--updates", "--columns=application,version,origin"],
-                capture_output=True,
-                text=True,
-                check=False
-            )
-            
-            updates = []
-            for line in result.stdout.strip().split('\n'):
-                if line:
-                    parts = line.split('\t')
-                    if len(parts) >= 3:
-                        updates.append({
-                            "name": parts[0],
-                            "version": parts[1],
-                            "origin": parts[2]
-                        })
-            
-            GLib.idle_add(self.update_ui_with_updates, "flatpak", updates)
-            
-            # Check Pacman updates
-            self.progress_bar.set_fraction(0.66)
-            self.progress_bar.set_text("Checking Pacman updates...")
-            threading.Thread(target=self.check_pacman_updates, daemon=True).start()
+    def _flush_log(self):
+        """Draw everything queued since the last frame in one go"""
+        with self.log_lock:
+            entries = list(self.pending_log)
+            self.pending_log.clear()
+            status = self.pending_status
+            self.pending_status = None
+            progress = self.stream_progress
+            self.stream_progress = None
+            self.log_flush_scheduled = False
+        
+        if entries:
+            # Merge neighbouring segments with the same tag into one insert
+            runs = []
+            for segments in entries:
+                for text, tag in segments:
+                    if runs and runs[-1][1] == tag:
+                        runs[-1][0].append(text)
+                    else:
+                        runs.append(([text], tag))
             
-        except Exception as e:
-            self.add_log(f"Error checking Flatpak updates: {e}", "error")
-    
-    def check_pacman_updates(self):
-        try:
-            result = subprocess.run(
-                ["checkupdates"],
-                capture_output=True,
-                text=True,
-                check=False
-            )
+            text_buffer = self.log_view.get_buffer()
+            for texts, tag in runs:
+                text_buffer.insert_with_tags_by_name(text_buffer.get_end_iter(), "".join(texts), tag)
             
-            updates = []
-            for line in result.stdout.strip().split('\n'):
-                if line:
-                    # checkupdates format: "package-name current-version -> new-version"
-                    parts = line.split()
-                    if len(parts) >= 4:
-                        updates.append({
-                            "name": parts[0],
-                            "old_version": parts[1],
-                            "new_version": parts[3]
-                        })
+            # Keep the view bounded by trimming the oldest lines
+            excess = text_buffer.get_line_count() - 1 - LOG_MAX_LINES
+            if excess > 0:
+                text_buffer.delete(text_buffer.get_start_iter(), text_buffer.get_iter_at_line(excess))
             
-            GLib.idle_add(self.update_ui_with_updates, "pacman", updates)
-            
-            # Check AUR updates
-            self.progress_bar.set_fraction(0.9)
-            self.progress_bar.set_text("Checking AUR updates...")
-            threading.Thread(target=self.check_aur_updates, daemon=True).start()
-            
-        except subprocess.CalledProcessError as e:
-            # checkupdates returns non-zero exit code when no updates are available
-            if e.returncode == 2:  # No updates available
-                GLib.idle_add(self.update_ui_with_updates, "pacman", [])
-            else:
-                self.add_log(f"Error checking Pacman updates: {e.stderr}", "error")
-        except Exception as e:
-            self.add_log(f"Error checking Pacman updates: {e}", "error")
+            # Scroll to end
+            text_buffer.place_cursor(text_buffer.get_end_iter())
+            self.log_view.scroll_mark_onscreen(text_buffer.get_insert())
+        
+        if status is not None:
+            self.status_bar.remove_all(self.status_context)
+            self.status_bar.push(self.status_context, status)
+        
+        if progress:
+            fraction, text = progress
+            self.progress_bar.set_fraction(fraction)
+            self.progress_bar.set_text(text)
+        
+        return False
     
-    def check_aur_updates(self):
+    def check_updates(self, backends=None):
+        self.cancel_checks()
+        generation = self.check_generation
+        backends = update_index.BACKENDS if backends is None else backends
+        self.checks_pending = set(backends)
+
+        if not backends:
+            self.add_log("Using cached update results", "info")
+            self.finish_update_check()
+            return
+
+        self.add_log("Checking for updates...", "info")
+        self.update_check_progress()
+
+        # All backends are network bound, so query them at the same time
+        for pkg_type in backends:
+            threading.Thread(target=self.run_check, args=(pkg_type, generation), daemon=True).start()
+
+    def cancel_checks(self):
+        """Invalidate the running check round and kill its processes"""
+        with self.check_lock:
+            self.check_generation += 1
+            procs = list(self.check_procs.values())
+            self.check_procs.clear()
+        for proc in procs:
+            try:
+                proc.kill()
+            except OSError:
+                pass
+
+    def run_check(self, pkg_type, generation):
+        """Run one backend's update check in a worker thread"""
+        cmd, timeout = update_index.CHECKS[pkg_type]
+        updates = None
         try:
-            result = subprocess.run(
-                ["yay", "-Qua"],
-                capture_output=True,
-                text=True,
-                check=False
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
             )
-            
-            updates = []
-            for line in result.stdout.strip().split('\n'):
-                if line and "aur/" in line:
-                    # Parse yay output
-                    parts = line.split()
-                    if len(parts) >= 4:
-                        name = parts[0].replace('aur/', '')
-                        updates.append({
-                            "name": name,
-                            "old_version": parts[1],
-                            "new_version": parts[3].strip()
-                        })
-            
-            GLib.idle_add(self.update_ui_with_updates, "yay", updates)
-            GLib.idle_add(self.finish_update_check)
-            
+            with self.check_lock:
+                if generation != self.check_generation:
+                    proc.kill()
+                    proc.wait()
+                    return
+                self.check_procs[pkg_type] = proc
+
+            try:
+                stdout, stderr = proc.communicate(timeout=timeout)
+                if generation == self.check_generation:
+                    updates = update_index.parse_check_output(pkg_type, proc.returncode, stdout, stderr)
+                    if updates is None:
+                        self.add_log(f"{pkg_type} update check failed: {stderr.strip()}", "error")
+                    else:
+                        update_index.store(pkg_type, updates)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                self.add_log(f"{pkg_type} update check timed out after {timeout}s", "warning")
+            finally:
+                with self.check_lock:
+                    if self.check_procs.get(pkg_type) is proc:
+                        del self.check_procs[pkg_type]
+
         except Exception as e:
-            self.add_log(f"Error checking AUR updates: {e}", "error")
-            GLib.idle_add(self.finish_update_check)
-    
+            self.add_log(f"Error checking {pkg_type} updates: {e}", "error")
+
+        GLib.idle_add(self.on_check_done, pkg_type, generation, updates)
+
+    def on_check_done(self, pkg_type, generation, updates):
+        # Results from a cancelled round are dropped
+        if generation != self.check_generation:
+            return False
+
+        if updates is not None:
+            self.update_ui_with_updates(pkg_type, updates)
+
+        self.checks_pending.discard(pkg_type)
+        self.update_check_progress()
+        if not self.checks_pending:
+            self.finish_update_check()
+        return False
+
+    def update_check_progress(self):
+        total = len(update_index.BACKENDS)
+        done = total - len(self.checks_pending)
+        self.progress_bar.set_fraction(done / total)
+        waiting = ", ".join(self.CHECK_NAMES[t] for t in update_index.BACKENDS if t in self.checks_pending)
+        self.progress_bar.set_text(f"Checking {waiting} updates... ({done}/{total})" if waiting else "Ready")
+
     def update_ui_with_updates(self, pkg_type, updates):
         self.updates[pkg_type]["available"] = updates
         self.updates[pkg_type]["count"] = len(updates)
         
-        listbox = self.ui_elements[pkg_type]["listbox"]
-        count_label = self.ui_elements[pkg_type]["count_label"]
-        
-        # Clear existing rows
-        for row in listbox.get_children():
-            listbox.remove(row)
-        
-        # Add update rows
-        for update in updates:
-            row = self.create_update_row(pkg_type, update)
-            listbox.add(row)
-        
-        # Update count label
-        count_text = f"Found {len(updates)} updates"
-        if pkg_type == "yay":
-            count_text += " (AUR)"
-        count_label.set_text(count_text)
-        count_label.set_markup(f"<span foreground='{self.colors['info']}'>{count_text}</span>")
+        store = self.ui_elements[pkg_type]["store"]
+        rows = self.ui_elements[pkg_type]["rows"]
+        
+        # Apply the result as a diff keyed by package name so unchanged
+        # rows (and their check state) are left alone
+        latest = {update["name"]: update for update in updates}
+        for name in [n for n in rows if n not in latest]:
+            store.remove(rows.pop(name))
+        self.updates[pkg_type]["selected"].retain(latest.keys())
+        if pkg_type == "pacman":
+            # Keep the tab whole: new packages join a fully selected tab
+            selection = self.updates[pkg_type]["selected"]
+            self.select_whole_system(selection, selection.everything)
+        
+        for name, update in latest.items():
+            version_text = self.format_version(pkg_type, update)
+            repo = update.get("repo", "unknown")
+            if name in rows:
+                row = store[rows[name]]
+                if row[COL_VERSION] != version_text or row[COL_REPO] != repo:
+                    store.set(rows[name], [COL_VERSION, COL_REPO], [version_text, repo])
+            else:
+                rows[name] = store.append([name, version_text, repo])
         
-        # Show listbox if updates exist
-        listbox.show_all()
+        self.update_repo_choices(pkg_type, sorted({row[COL_REPO] for row in store}))
+        self.update_count_label(pkg_type)
         
         self.add_log(f"Found {len(updates)} {pkg_type} updates", "info")
     
@@ -345,60 +635,111 @@ class UpdateManager(Gtk.Window):
         self.progress_bar.set_fraction(0)
         self.progress_bar.set_text("Ready")
     
-    def create_update_row(self, pkg_type, update):
-        row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
-        row.set_margin_start(10)
-        row.set_margin_end(10)
-        row.set_margin_top(5)
-        row.set_margin_bottom(5)
-        
-        # Checkbox
-        check = Gtk.CheckButton()
-        check.connect("toggled", self.on_update_toggled, pkg_type, update["name"])
-        row.pack_start(check, False, False, 0)
-        
-        # Package name
-        name_label = Gtk.Label(label=f"<b>{update['name']}</b>")
-        name_label.set_use_markup(True)
-        name_label.set_halign(Gtk.Align.START)
-        name_label.set_hexpand(True)
-        row.pack_start(name_label, True, True, 0)
-        
-        # Version info
+    def update_count_label(self, pkg_type):
+        count_label = self.ui_elements[pkg_type]["count_label"]
+        count_text = f"Found {self.updates[pkg_type]['count']} updates"
+        if pkg_type == "yay":
+            count_text += " (AUR)"
+        selected = len(self.updates[pkg_type]["selected"])
+        if selected:
+            count_text += f", {selected} selected"
+        count_label.set_markup(f"<span foreground='{self.colors['info']}'>{count_text}</span>")
+    
+    def update_repo_choices(self, pkg_type, repos):
+        elements = self.ui_elements[pkg_type]
+        if repos == elements["repos"]:
+            return
+        combo = elements["repo_combo"]
+        current = combo.get_active_text()
+        elements["repos"] = repos
+        combo.remove_all()
+        combo.append_text(ALL_REPOS)
+        for repo in repos:
+            combo.append_text(repo)
+        choices = [ALL_REPOS] + repos
+        combo.set_active(choices.index(current) if current in choices else 0)
+    
+    def filter_active(self, pkg_type):
+        elements = self.ui_elements[pkg_type]
+        query = elements["search"].get_text().strip().casefold()
+        repo = elements["repo_combo"].get_active_text()
+        return query, (None if repo in (None, ALL_REPOS) else repo)
+    
+    def filter_visible(self, model, tree_iter, pkg_type):
+        query, repo = self.ui_elements[pkg_type]["filter_state"]
+        if repo and model[tree_iter][COL_REPO] != repo:
+            return False
+        return not query or query in model[tree_iter][COL_NAME].casefold()
+    
+    def on_filter_changed(self, widget, pkg_type):
+        elements = self.ui_elements[pkg_type]
+        elements["filter_state"] = self.filter_active(pkg_type)
+        elements["filter"].refilter()
+    
+    def render_selected(self, column, renderer, model, tree_iter, pkg_type):
+        renderer.set_property("active", model[tree_iter][COL_NAME] in self.updates[pkg_type]["selected"])
+    
+    def format_version(self, pkg_type, update):
         if pkg_type == "flatpak":
-            version_text = f"{update['version']} ({update['origin']})"
+            return f"{update['version']} ({update['origin']})"
+        return f"{update['old_version']} → {update['new_version']}"
+    
+    def on_update_toggled(self, renderer, path, pkg_type):
+        elements = self.ui_elements[pkg_type]
+        model = elements["filter"]
+        package_name = model[path][COL_NAME]
+        selected = self.updates[pkg_type]["selected"]
+        state = package_name not in selected
+        if pkg_type == "pacman":
+            # The whole tab follows the clicked row
+            self.select_whole_system(selected, state)
+            elements["treeview"].queue_draw()
         else:
-            version_text = f"{update['old_version']} → {update['new_version']}"
-        
-        version_label = Gtk.Label(label=version_text)
-        version_label.set_halign(Gtk.Align.END)
-        row.pack_start(version_label, False, False, 0)
-        
-        return row
+            selected.set(package_name, state)
+            model.row_changed(path, model.get_iter(path))
+        self.update_count_label(pkg_type)
     
-    def on_update_toggled(self, checkbutton, pkg_type, package_name):
-        if checkbutton.get_active():
-            self.updates[pkg_type]["selected"].append(package_name)
+    def select_whole_system(self, selected, state):
+        """Pacman selections are all-or-nothing, see plan_updates"""
+        if state:
+            selected.select_all()
         else:
-            if package_name in self.updates[pkg_type]["selected"]:
-                self.updates[pkg_type]["selected"].remove(package_name)
+            selected.clear()
     
-    def on_select_all_clicked(self, button, pkg_type):
-        listbox = self.ui_elements[pkg_type]["listbox"]
-        for row in listbox.get_children():
-            checkbox = row.get_children()[0]  # First child is the checkbox
-            checkbox.set_active(True)
+    def on_bulk_select_clicked(self, button, pkg_type, mode):
+        elements = self.ui_elements[pkg_type]
+        selected = self.updates[pkg_type]["selected"]
+        query, repo = elements["filter_state"]
+        if pkg_type == "pacman":
+            # All-or-nothing, so a filter doesn't narrow what the buttons do
+            state = mode == "all" or (mode == "invert" and not len(selected))
+            self.select_whole_system(selected, state)
+        elif query or repo:
+            # Only the rows the filter shows are affected
+            for row in elements["filter"]:
+                name = row[COL_NAME]
+                selected.set(name, mode == "all" or (mode == "invert" and name not in selected))
+        elif mode == "all":
+            selected.select_all()
+        elif mode == "none":
+            selected.clear()
+        else:
+            selected.invert()
+        
+        # The toggles read the selection while drawing, so one redraw is enough
+        elements["treeview"].queue_draw()
+        self.update_count_label(pkg_type)
+    
+    def on_map(self, widget):
+        if self.shown_before and not self.updating and not self.checks_pending:
+            stale = update_index.stale_backends()
+            if stale:
+                self.check_updates(stale)
+        self.shown_before = True
     
     def on_refresh_clicked(self, button):
         self.add_log("Refreshing update list...", "info")
-        # Clear existing updates
-        for pkg_type in ["flatpak", "pacman", "yay"]:
-            self.updates[pkg_type] = {"available": [], "selected": [], "count": 0}
-            listbox = self.ui_elements[pkg_type]["listbox"]
-            for row in listbox.get_children():
-                listbox.remove(row)
-            self.ui_elements[pkg_type]["count_label"].set_text("")
-        
+        # Rows and selections stay; the new results are applied as a diff
         self.update_all_btn.set_sensitive(False)
         self.update_selected_btn.set_sensitive(False)
         self.check_updates()
@@ -408,7 +749,9 @@ class UpdateManager(Gtk.Window):
         
         # Select all updates
         for pkg_type in ["flatpak", "pacman", "yay"]:
-            self.updates[pkg_type]["selected"] = [update["name"] for update in self.updates[pkg_type]["available"]]
+            self.updates[pkg_type]["selected"].select_all()
+            self.ui_elements[pkg_type]["treeview"].queue_draw()
+            self.update_count_label(pkg_type)
         
         self.perform_updates()
     
@@ -417,100 +760,186 @@ class UpdateManager(Gtk.Window):
         self.perform_updates()
     
     def perform_updates(self):
+        self.updating = True
         # Disable buttons during update
         self.update_all_btn.set_sensitive(False)
         self.update_selected_btn.set_sensitive(False)
         
+        # Resolve the selections here, the worker must not read GTK-side state
+        selected = {
+            pkg_type: self.updates[pkg_type]["selected"].resolve([u["name"] for u in self.updates[pkg_type]["available"]])
+            for pkg_type in self.updates
+        }
+        
         # Start update process
-        threading.Thread(target=self.run_updates, daemon=True).start()
-    
-    def run_updates(self):
-        # Update Flatpaks
-        flatpak_selected = self.updates["flatpak"]["selected"]
-        if flatpak_selected:
-            GLib.idle_add(self.progress_bar.set_fraction, 0.2)
-            GLib.idle_add(self.progress_bar.set_text, f"Updating {len(flatpak_selected)} Flatpak(s)")
-            
-            try:
-                cmd = ["flatpak", "update", "-y"] + flatpak_selected
-                self.add_log(f"Running: {' '.join(cmd)}", "updating")
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
-                if result.returncode == 0:
-                    self.add_log(f"Successfully updated {len(flatpak_selected)} Flatpaks", "success")
+        threading.Thread(target=self.run_updates, args=(selected,), daemon=True).start()
+    
+    def run_updates(self, selected):
+        os.makedirs(PKG_CACHE, exist_ok=True)
+        plan = plan_updates(selected)
+        
+        results = {}
+        total_start = time.monotonic()
+        for phase, jobs in plan:
+            runnable = []
+            for job in jobs:
+                failed = [dep for dep in job["requires"] if results.get(dep) != 0]
+                if failed:
+                    self.add_log(f"Skipping {job['label']}: {', '.join(failed)} did not succeed", "warning")
                 else:
-                    self.add_log(f"Failed to update Flatpaks: {result.stderr}", "error")
-            except Exception as e:
-                self.add_log(f"Error updating Flatpak: {e}", "error")
-        
-        # Update Pacman packages
-        pacman_selected = self.updates["pacman"]["selected"]
-        if pacman_selected:
-            GLib.idle_add(self.progress_bar.set_fraction, 0.5)
-            GLib.idle_add(self.progress_bar.set_text, f"Updating {len(pacman_selected)} Pacman package(s)")
+                    runnable.append(job)
+            jobs = runnable
+            if not jobs:
+                continue
             
-            # Use pkexec for pacman
-            try:
-                self.add_log("Requesting sudo permissions for Pacman updates...", "info")
-                
-                # Use pkexec for polkit authentication
-                cmd = ["pkexec", "pacman", "-Syu", "--noconfirm"] + pacman_selected
-                self.add_log(f"Running: {' '.join(cmd)}", "updating")
-                
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
-                
-                if result.returncode == 0:
-                    self.add_log("Successfully updated Pacman packages", "success")
-                else:
-                    self.add_log(f"Failed to update Pacman packages: {result.stderr}", "error")
-                    
-            except Exception as e:
-                self.add_log(f"Error updating Pacman packages: {e}", "error")
-        
-        # Update AUR packages (yay doesn't need sudo)
-        aur_selected = self.updates["yay"]["selected"]
-        if aur_selected:
-            GLib.idle_add(self.progress_bar.set_fraction, 0.8)
-            GLib.idle_add(self.progress_bar.set_text, f"Updating {len(aur_selected)} AUR package(s)")
+            self.add_log(f"{phase}: {', '.join(job['label'] for job in jobs)}", "updating")
+            GLib.idle_add(self.progress_bar.set_fraction, 0.0)
+            GLib.idle_add(self.progress_bar.set_text, f"{phase}...")
             
-            try:
-                cmd = ["yay", "-S", "--noconfirm"] + aur_selected
-                self.add_log(f"Running: {' '.join(cmd)}", "updating")
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
-                if result.returncode == 0:
-                    self.add_log(f"Successfully updated {len(aur_selected)} AUR packages", "success")
-                else:
-                    self.add_log(f"Failed to update AUR packages: {result.stderr}", "error")
-            except Exception as e:
-                self.add_log(f"Error updating AUR packages: {e}", "error")
+            # Jobs within a phase are independent, so run them side by side
+            phase_start = time.monotonic()
+            threads = [threading.Thread(target=self.run_update_job, args=(job, results), daemon=True) for job in jobs]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.add_log(f"{phase} finished in {time.monotonic() - phase_start:.1f}s", "info")
+        
+        if results.get("pacman-install") == 0:
+            clear_download_cache()
         
         # Finalize
         GLib.idle_add(self.progress_bar.set_fraction, 1.0)
         GLib.idle_add(self.progress_bar.set_text, "Update complete!")
-        self.add_log("All updates completed!", "success")
+        failed = [key for key, code in results.items() if code != 0]
+        if failed:
+            self.add_log(f"Updates finished with errors in {time.monotonic() - total_start:.1f}s", "warning")
+        else:
+            self.add_log(f"All updates completed in {time.monotonic() - total_start:.1f}s!", "success")
         
         # Re-enable buttons
+        self.updating = False
         GLib.idle_add(self.update_all_btn.set_sensitive, True)
         GLib.idle_add(self.update_selected_btn.set_sensitive, True)
         
         # Refresh update list after 2 seconds
         GLib.timeout_add_seconds(2, self.on_refresh_clicked, None)
     
+    def run_update_job(self, job, results):
+        start = time.monotonic()
+        try:
+            self.add_log(f"Running: {' '.join(job['cmd'])}", "updating")
+            returncode = self.run_streaming(job["cmd"], job["label"])
+        except Exception as e:
+            self.add_log(f"Error running {job['label']}: {e}", "error")
+            returncode = -1
+        results[job["key"]] = returncode
+        
+        elapsed = time.monotonic() - start
+        if returncode == 0:
+            self.add_log(f"{job['label']} succeeded in {elapsed:.1f}s", "success")
+        elif job["optional"]:
+            self.add_log(f"{job['label']} failed (exit code {returncode}), continuing", "warning")
+        else:
+            self.add_log(f"{job['label']} failed (exit code {returncode}) after {elapsed:.1f}s", "error")
+    
+    def run_streaming(self, cmd, label):
+        """Run cmd from a worker thread, streaming its output into the log
+
+        The pipes are read by GLib IO watches on the main loop and the
+        worker just waits for the exit code.
+        """
+        done = threading.Event()
+        result = {"returncode": -1}
+        GLib.idle_add(self._start_stream, cmd, label, done, result)
+        done.wait()
+        return result["returncode"]
+
+    def _start_stream(self, cmd, label, done, result):
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL)
+        except Exception as e:
+            self.add_log(f"Error running {cmd[0]}: {e}", "error")
+            done.set()
+            return False
+
+        stream = {
+            "proc": proc,
+            "label": label,
+            "done": done,
+            "result": result,
+            "open": 2,
+            "step": None
+        }
+        for pipe, tag in ((proc.stdout, "info"), (proc.stderr, "warning")):
+            fd = pipe.fileno()
+            os.set_blocking(fd, False)
+            reader = {
+                "pipe": pipe,
+                "tag": tag,
+                "decoder": codecs.getincrementaldecoder("utf-8")(errors="replace"),
+                "partial": ""
+            }
+            GLib.io_add_watch(fd, GLib.PRIORITY_DEFAULT,
+                              GLib.IOCondition.IN | GLib.IOCondition.HUP | GLib.IOCondition.ERR,
+                              self._on_stream_data, stream, reader)
+        return False
+
+    def _on_stream_data(self, fd, condition, stream, reader):
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            return True
+        except OSError:
+            data = b""
+
+        if data:
+            text = reader["partial"] + reader["decoder"].decode(data)
+            # Progress bars redraw with \r, so treat it as a line break too
+            lines = LINE_SPLIT.split(text)
+            reader["partial"] = lines.pop()[-MAX_PARTIAL_LINE:]
+            for line in lines:
+                self._on_stream_line(stream, line, reader["tag"])
+            return True
+
+        # EOF: flush whatever is left and close this pipe
+        tail = reader["partial"] + reader["decoder"].decode(b"", final=True)
+        if tail:
+            self._on_stream_line(stream, tail, reader["tag"])
+        reader["pipe"].close()
+        stream["open"] -= 1
+        if stream["open"] == 0:
+            stream["result"]["returncode"] = stream["proc"].wait()
+            stream["done"].set()
+        return False
+
+    def _on_stream_line(self, stream, line, tag):
+        line = line.rstrip()
+        if not line:
+            return
+
+        step = STEP_RE.search(line)
+        if step:
+            stream["step"] = (int(step.group(1)), int(step.group(2)))
+        percent = PERCENT_RE.findall(line)
+        if percent:
+            fraction = min(int(percent[-1]), 100) / 100
+            if stream["step"]:
+                current, total = stream["step"]
+                fraction = (current - 1 + fraction) / max(total, 1)
+            with self.log_lock:
+                self.stream_progress = (min(fraction, 1.0), f"{stream['label']}: {line.strip()[:60]}")
+            # Redrawn progress lines only move the bar, they don't spam the log
+            if not line.endswith("100%"):
+                self.schedule_log_flush()
+                return
+
+        self.file_log.info(line)
+        self.queue_log([(line + "\n", tag)])
+
     def on_clear_log_clicked(self, button):
+        with self.log_lock:
+            self.pending_log.clear()
         text_buffer = self.log_view.get_buffer()
         text_buffer.set_text("")
 
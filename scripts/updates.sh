@@ -9,46 +9,17 @@ AUR_ICON="<span font='20px'></span>"         # AUR Icon (Nerd Font)
 FLATPAK_ICON="<span font='20px'></span>"     # Flatpak Icon (Nerd Font)
 NO_UPDATES_ICON="<span font='20px'>󰂪</span>"  # Up-to-date Icon (Nerd Font)
 
-# --- Update Check Functions ---
+# --- Update Check ---
 
-# Check Pacman official repositories (requires pacman-contrib for checkupdates)
-count_pacman() {
-    # checkupdates: Lists official repository updates
-    if command -v checkupdates &> /dev/null; then
-        checkupdates 2>/dev/null | wc -l
-    else
-        # Fallback to pacman -Qu, less safe as it touches the main DB
-        # Only use if you understand the risks
-        # pacman -Qu 2>/dev/null | wc -l
-        echo "0"
-    fi
-}
-
-# Check AUR/Yay updates
-count_yay() {
-    # yay -Qu: Lists AUR updates (and sometimes Pacman, but checkupdates handles the main ones)
-    if command -v yay &> /dev/null; then
-        yay -Qu --aur --quiet 2>/dev/null | wc -l
-    else
-        echo "0"
-    fi
-}
-
-# Check Flatpak updates
-count_flatpak() {
-    # flatpak remote-ls --updates: Lists available Flatpak updates
-    if command -v flatpak &> /dev/null; then
-        flatpak remote-ls --updates 2>/dev/null | grep -c "flatpak"
-    else
-        echo "0"
-    fi
-}
+# update_index.py shares its cached results with the Update Manager and only
+# re-runs checkupdates, yay and flatpak for backends whose results are stale
+SCRIPT_DIR="$(dirname "$(realpath "$0")")"
 
-# --- Main Logic ---
+read -r PACMAN_COUNT YAY_COUNT FLATPAK_COUNT < <(python3 "${SCRIPT_DIR}/update_index.py" --counts 2>/dev/null)
 
-PACMAN_COUNT=$(count_pacman)
-YAY_COUNT=$(count_yay)
-FLATPAK_COUNT=$(count_flatpak)
+PACMAN_COUNT=${PACMAN_COUNT:-0}
+YAY_COUNT=${YAY_COUNT:-0}
+FLATPAK_COUNT=${FLATPAK_COUNT:-0}
 
 TOTAL_COUNT=$((PACMAN_COUNT + YAY_COUNT + FLATPAK_COUNT))
 